@@ -0,0 +1,169 @@
+"""
+Times each stage of the install pipeline against synthetic PCKs and
+translation archives: reading the archive resource, extracting it for
+the external packer, backing the original up, patching in place,
+rebuilding the PCK and swapping the rebuilt file in.
+
+    python -m benchmarks.bench_install [--scenario 50:1000 ...]
+        [--translated 0.1] [--dir /var/tmp] [--json out.json]
+
+Each scenario is PCK_MB:ENTRIES, e.g. 4096:100000 for a 4 GB PCK with
+100k entries. Fixtures are written under --dir, which should live on the
+same kind of disk the game would.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import zipfile
+from functools import partial
+from pathlib import Path
+
+from benchmarks.fixtures import make_pck, make_translation_zip, tree_size
+from src.engine import BackupCreated, Installer
+from src.engine.patch import make_backup, zip_entries
+from src.resource_io import ResourceReader
+from src.utils import resource_path
+
+DEFAULT_SCENARIOS = ["50:1000", "500:10000"]
+
+
+class _Stages:
+    def __init__(self):
+        self.results: dict[str, dict] = {}
+
+    def time(self, name: str, step, nbytes=None):
+        start = time.perf_counter()
+        result = step()
+        seconds = time.perf_counter() - start
+        self.results[name] = {"seconds": seconds}
+        if nbytes is not None:
+            self.results[name]["bytes"] = nbytes(result)
+        print(f"  {name:<14} {seconds:8.3f} s")
+        return result
+
+
+def _read_resource(archive: Path) -> int:
+    buffer = bytearray(4 * 1024 * 1024)
+    total = 0
+    with ResourceReader(str(archive)) as reader:
+        while count := reader.readinto(buffer):
+            total += count
+    return total
+
+
+def _run(workdir: Path, pck_mb: int, entries: int, ratio: float) -> dict:
+    game = workdir / "game"
+    game.mkdir()
+    target = game / "UntilThen.pck"
+    archive = workdir / "translation_files.zip"
+    translated = max(1, int(entries * ratio))
+    entry_size = max(1, pck_mb * 1024 * 1024 // entries)
+
+    start = time.perf_counter()
+    make_pck(target, entries, pck_mb * 1024 * 1024)
+    make_translation_zip(archive, entries, translated, entry_size)
+    print(f"{pck_mb} MB, {entries} entries, {translated} translated"
+          f" (fixtures in {time.perf_counter() - start:.1f} s)")
+
+    events = []
+    installer = Installer(
+        target,
+        partial(ResourceReader, str(archive)),
+        make_backup=False,
+        on_event=events.append,
+    )
+    installer.prepare()
+    stages = _Stages()
+
+    stages.time("resource_read", partial(_read_resource, archive), int)
+    stages.time(
+        "unzip",
+        partial(installer.extract, workdir / "extract"),
+        lambda _: tree_size(workdir / "extract"),
+    )
+
+    backup_dir = workdir / "backup"
+    backup_dir.mkdir()
+    with ResourceReader(str(archive)) as reader, \
+            zipfile.ZipFile(reader) as zf:
+        patches = list(zip_entries(zf, installer.folder))
+        stages.time(
+            "backup",
+            partial(
+                make_backup, target, backup_dir, True, patches,
+                lambda strategy, size: events.append(
+                    BackupCreated(strategy, size)
+                ),
+            ),
+            lambda _: tree_size(backup_dir),
+        )
+    backups = [e for e in events if isinstance(e, BackupCreated)]
+
+    stages.time(
+        "patch_append",
+        partial(installer.patch, append=True),
+        lambda _: target.stat().st_size,
+    )
+    installer.rollback()
+
+    stages.time(
+        "patch_rebuild",
+        partial(installer.patch, append=False),
+        lambda _: installer.output.stat().st_size,
+    )
+    stages.time("swap", installer.commit)
+
+    return {
+        "pck_bytes": pck_mb * 1024 * 1024,
+        "entries": entries,
+        "translated": translated,
+        "backup_strategy": backups[-1].strategy if backups else None,
+        "stages": stages.results,
+    }
+
+
+def _environment() -> dict:
+    with open(resource_path("config.json"), encoding="utf-8") as config:
+        setup_version = json.load(config).get("setup_version")
+    return {
+        "setup_version": setup_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        help="PCK_MB:ENTRIES, may be repeated",
+    )
+    parser.add_argument("--translated", type=float, default=0.1)
+    parser.add_argument("--dir", type=Path)
+    parser.add_argument("--json", type=Path)
+    args = parser.parse_args()
+
+    results = []
+    for scenario in args.scenario or DEFAULT_SCENARIOS:
+        pck_mb, entries = (int(part) for part in scenario.split(":"))
+        with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+            results.append(
+                _run(Path(workdir), pck_mb, entries, args.translated)
+            )
+
+    report = {"environment": _environment(), "results": results}
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Times how long the installer takes to paint its first window, measured
+in fresh processes so that module imports are counted. Also lists which
+of the heavier modules were loaded by then.
+
+    python -m benchmarks.bench_startup [--runs 5] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HEAVY_MODULES = [
+    "qtawesome",
+    "vdf",
+    "src.pages.welcome",
+    "src.pages.pick_target",
+    "src.pages.install_files",
+    "src.pages.final_page",
+    "src.engine",
+]
+
+
+def _child():
+    start = time.perf_counter()
+
+    from PySide6.QtCore import QEvent, QObject, QResource, QTimer
+    from PySide6.QtWidgets import QApplication
+
+    from src.utils import resource_path
+    from src.window import AppWindow
+
+    imported = time.perf_counter()
+    app = QApplication(sys.argv)
+    QResource.registerResource(str(resource_path("assets.rcc")))
+    window = AppWindow(config={})
+    created = time.perf_counter()
+    timings = {}
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and not timings:
+                timings["first_paint"] = time.perf_counter() - start
+                QTimer.singleShot(0, app.quit)
+            return super().eventFilter(obj, event)
+
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    window.show()
+    app.exec()
+
+    print(json.dumps({
+        "imports": imported - start,
+        "window": created - imported,
+        "first_paint": timings.get("first_paint"),
+        "loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def _run_once() -> dict:
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+        cwd=Path(__file__).resolve().parents[1],
+    ).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = wall
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", type=Path)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child()
+        return
+
+    runs = [_run_once() for _ in range(args.runs)]
+    report = {
+        key: statistics.median(run[key] for run in runs)
+        for key in ("imports", "window", "first_paint", "process")
+    }
+    report["loaded"] = runs[-1]["loaded"]
+    report["runs"] = runs
+
+    for key in ("imports", "window", "first_paint", "process"):
+        print(f"{key:<12} {report[key]:8.3f} s")
+    print("loaded:", ", ".join(report["loaded"]) or "-")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Times the fallback extraction with the real page handlers attached, for
+archives of the same total size split into more and more members. With
+batched progress the GUI thread no longer grows with the member count;
+what is left is the filesystem cost of creating each file.
+
+The per-member mode sends one progress event per extracted file, as the
+page did before batching. It writes the same files, so the difference
+between the two modes is the GUI-thread cost of the signals.
+
+    python -m benchmarks.bench_unzip_progress [--size-mb 32]
+        [--mode batched|per-member|both] [--json out.json]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from functools import partial
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QEventLoop  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from src.engine import Installer  # noqa: E402
+from src.pages.install_files import InstallFilesPage  # noqa: E402
+from src.progress import EMIT_RATE  # noqa: E402
+
+MEMBER_COUNTS = [100, 1000, 10000, 30000]
+# Progress events per second at most in each mode.
+MODES = {"batched": EMIT_RATE, "per-member": math.inf}
+
+
+def _make_zip(path: Path, members: int, total_bytes: int):
+    size = max(1, total_bytes // members)
+    payload = os.urandom(size)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(members):
+            zf.writestr(f"full/assets/{i % 100}/{i}.bin", payload)
+
+
+def _run(
+        page: InstallFilesPage,
+        archive: Path,
+        destination: Path,
+        mode: str,
+) -> float:
+    page._installer = Installer(
+        destination / "UntilThen.pck",
+        partial(open, archive, "rb"),
+        on_event=page._installer_event.emit,
+        progress_rate=MODES[mode],
+    )
+    loop = QEventLoop()
+    start = time.perf_counter()
+    page._run_step(
+        partial(page._installer.extract, destination),
+        lambda _: loop.quit(),
+        lambda _: loop.quit(),
+    )
+    loop.exec()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--mode", choices=[*MODES, "both"], default="both")
+    parser.add_argument("--json", type=Path)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    page = InstallFilesPage()
+    page._process_started = True  # only the extraction stage is measured
+    page.show()
+    app.processEvents()
+
+    modes = list(MODES) if args.mode == "both" else [args.mode]
+    results = []
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+        for members in MEMBER_COUNTS:
+            archive = temp / f"{members}.zip"
+            _make_zip(archive, members, args.size_mb * 1024 * 1024)
+            for mode in modes:
+                seconds = _run(
+                    page, archive, temp / f"out_{members}_{mode}", mode)
+                results.append(
+                    {"members": members, "mode": mode, "seconds": seconds})
+                print(f"{members:>8} members  {mode:<10}  {seconds:8.3f} s")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Synthetic stand-ins for UntilThen.pck and translation_files.zip, so the
+install pipeline can be measured without the game.
+"""
+import hashlib
+import os
+import random
+import zipfile
+from pathlib import Path
+
+from src.pck import PACK_REL_FILEBASE, PCK_PADDING, PCKEntry, PCKIndex, \
+    directory_size, write_index
+
+# Entry contents are slices of one random pool, so that generating a
+# multi-GB PCK costs little more than writing it. The pool is larger than
+# the LZMA dictionary, so delta backups cannot cheat by matching it.
+_POOL_SIZE = 16 * 1024 * 1024
+
+
+def _pad(n: int) -> int:
+    rest = n % PCK_PADDING
+    return PCK_PADDING - rest if rest else 0
+
+
+def _pool(seed: int) -> bytes:
+    return random.Random(seed).randbytes(_POOL_SIZE)
+
+
+def _entry_data(pool: bytes, index: int, size: int) -> bytes:
+    data = bytearray()
+    offset = (index * 7919) % _POOL_SIZE
+    while len(data) < size:
+        take = min(size - len(data), _POOL_SIZE - offset)
+        data += pool[offset:offset + take]
+        offset = 0
+    return bytes(data)
+
+
+def entry_paths(entries: int) -> list[str]:
+    return [f"assets/dir{i % 256}/file{i}.bin" for i in range(entries)]
+
+
+def make_pck(path: Path, entries: int, total_bytes: int, seed: int = 0) -> None:
+    """
+    Writes a format 2 PCK of roughly `total_bytes` split evenly over
+    `entries` files, laid out the way Godot 4 exports them.
+    """
+    pool = _pool(seed)
+    size = max(1, total_bytes // entries)
+    paths = entry_paths(entries)
+
+    index_entries = []
+    offset = 0
+    for name in paths:
+        index_entries.append(PCKEntry("res://" + name, offset, size))
+        offset += size + _pad(size)
+
+    header_size = directory_size(index_entries)
+    index = PCKIndex(
+        ver_major=4,
+        ver_minor=2,
+        ver_patch=2,
+        pack_flags=PACK_REL_FILEBASE,
+        file_base=header_size + _pad(header_size),
+        entries=index_entries,
+    )
+
+    with open(path, "wb") as file:
+        write_index(file, index)
+        file.write(bytes(index.file_base - header_size))
+        for i, entry in enumerate(index_entries):
+            data = _entry_data(pool, i, size)
+            entry.md5 = hashlib.md5(data).digest()
+            file.write(data)
+            file.write(bytes(_pad(size)))
+        write_index(file, index)
+
+
+def make_translation_zip(
+        path: Path,
+        entries: int,
+        translated: int,
+        entry_size: int,
+        folder: str = "full",
+        seed: int = 1,
+) -> None:
+    """
+    Writes a translation archive replacing `translated` of the `entries`
+    files of a `make_pck` PCK with slightly larger, different contents.
+    """
+    pool = _pool(seed)
+    paths = entry_paths(entries)
+    chosen = random.Random(seed).sample(range(entries), translated)
+    size = entry_size + entry_size // 10 + 1
+
+    with zipfile.ZipFile(
+            path, "w", zipfile.ZIP_DEFLATED, compresslevel=1
+    ) as zf:
+        for i in sorted(chosen):
+            zf.writestr(f"{folder}/{paths[i]}", _entry_data(pool, i, size))
+
+
+def tree_size(path: Path) -> int:
+    return sum(
+        (Path(root) / name).stat().st_size
+        for root, _, names in os.walk(path)
+        for name in names
+    )
@@ -1,28 +1,9 @@
 import json
 import sys
 
-from PySide6.QtCore import QObject, QEvent, Qt, QResource, QTranslator, \
-    QLocale, QLibraryInfo
-from PySide6.QtWidgets import QApplication, QPushButton
-
+from src.assets import UI_BUNDLE
+from src.cli import run_cli
 from src.utils import resource_path
-from src.window import AppWindow
-
-
-class _ButtonDisableFilter(QObject):
-    """
-    This filter prevents the hover effect
-    freeze after a QPushButton is set to disable.
-    """
-
-    def eventFilter(self, obj, event):
-        if event.type() == QEvent.Type.EnabledChange:
-            if isinstance(obj, QPushButton) and not obj.isEnabled():
-                obj.setAttribute(Qt.WidgetAttribute.WA_UnderMouse, False)
-                obj.style().unpolish(obj)
-                obj.style().polish(obj)
-        return super().eventFilter(obj, event)
-
 
 try:
     with open(resource_path("config.json"), "r", encoding="utf-8") as config_file:
@@ -33,9 +14,19 @@ except Exception as error:
     sys.exit(1)
 
 if __name__ == "__main__":
+    exit_code = run_cli(sys.argv[1:], config_data.get("setup_version", ""))
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    # Qt widgets are only loaded once it is clear the GUI is needed.
+    from PySide6.QtCore import QResource, QTranslator, QLocale, QLibraryInfo
+    from PySide6.QtWidgets import QApplication
+
+    from src.window import AppWindow, ButtonDisableFilter
+
     app = QApplication(sys.argv)
-    app.installEventFilter(_ButtonDisableFilter(app))
-    QResource.registerResource(str(resource_path("assets.rcc")))
+    app.installEventFilter(ButtonDisableFilter(app))
+    QResource.registerResource(str(resource_path(UI_BUNDLE)))
 
     translator = QTranslator()
     locale = QLocale.system().name()
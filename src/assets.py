@@ -0,0 +1,30 @@
+import platform
+
+from src.resource_io import ResourceReader
+from src.utils import resource_path
+
+# Only the small images the windows show are compiled into assets.rcc,
+# which is registered at startup. The large install payloads ship as
+# plain files, each build carrying just its own platform's packer, and
+# are memory mapped when a stage first needs them.
+UI_BUNDLE = "assets.rcc"
+TRANSLATION_FILES = "assets/translation_files.zip"
+PCK_EXPLORER_VERSION = "1.5.3"
+PCK_EXPLORERS = {
+    "Windows": f"assets/GodotPCKExplorer_{PCK_EXPLORER_VERSION}"
+               "_native-console-win-64.zip",
+    "Linux": f"assets/GodotPCKExplorer_{PCK_EXPLORER_VERSION}"
+             "_native-console-linux-64.zip",
+}
+
+
+def open_payload(relative_path: str) -> ResourceReader:
+    path = resource_path(relative_path)
+    if not path.is_file():
+        raise OSError(f"Arquivo não encontrado: {relative_path}")
+    return ResourceReader(str(path))
+
+
+def pck_explorer_payload() -> str:
+    system = "Windows" if platform.system() == "Windows" else "Linux"
+    return PCK_EXPLORERS[system]
@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from src.delta import DeltaError, restore_delta
+from src.hashing import HASH_SCHEME, tree_hash_file
+from src.pck import ProgressCallback
+
+BACKUP_NAME = "UntilThen.pck.backup"
+DELTA_NAME = "UntilThen.pck.delta"
+RECORD_NAME = "UntilThen.pck.backup.json"
+RESTORE_NAME = "UntilThen.pck.restore"
+
+# From linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+class BackupError(Exception):
+    pass
+
+
+class RestoreError(Exception):
+    pass
+
+
+@dataclass
+class BackupResult:
+    strategy: str  # "reflink", "hardlink", "copy_file_range", "sendfile" or "copy"
+    extra_bytes: int  # free space the backup actually consumed
+
+
+def _reflink(source: Path, backup: Path) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    with open(source, "rb") as src, open(backup, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            pass
+
+    backup.unlink()
+    return False
+
+
+def _hardlink(source: Path, backup: Path) -> bool:
+    try:
+        os.link(source, backup)
+        return True
+    except OSError:
+        return False
+
+
+def _copy(source: Path, backup: Path) -> str:
+    size = source.stat().st_size
+    with open(source, "rb") as src, open(backup, "xb") as dst:
+        if hasattr(os, "copy_file_range"):
+            try:
+                copied = 0
+                while copied < size:
+                    n = os.copy_file_range(
+                        src.fileno(), dst.fileno(), COPY_CHUNK_SIZE
+                    )
+                    if not n:
+                        break
+                    copied += n
+                if copied == size:
+                    return "copy_file_range"
+            except OSError:
+                pass
+            src.seek(0)
+            dst.seek(0)
+            dst.truncate()
+
+        if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+            try:
+                offset = 0
+                while offset < size:
+                    n = os.sendfile(
+                        dst.fileno(), src.fileno(), offset, COPY_CHUNK_SIZE
+                    )
+                    if not n:
+                        break
+                    offset += n
+                if offset == size:
+                    return "sendfile"
+            except OSError:
+                pass
+            dst.seek(0)
+            dst.truncate()
+
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return "copy"
+
+
+def create_backup(
+        source: Path,
+        backup: Path,
+        in_place: bool,
+        allow_copy: bool = True,
+) -> BackupResult:
+    """
+    Copies `source` to `backup` as cheaply as the filesystem allows:
+    a reflink (Btrfs, XFS) shares every block; a hardlink shares the whole
+    file and is only valid when the install replaces `source` with a new
+    file (`in_place=False`); otherwise the bytes are copied in the kernel
+    when possible.
+
+    Raises BackupError when only a full copy was possible and
+    `allow_copy` is False.
+    """
+    free_before = shutil.disk_usage(backup.parent).free
+
+    if _reflink(source, backup):
+        strategy = "reflink"
+    elif not in_place and _hardlink(source, backup):
+        strategy = "hardlink"
+    elif allow_copy:
+        strategy = _copy(source, backup)
+        shutil.copystat(source, backup)
+    else:
+        raise BackupError("O sistema de arquivos não suporta cópia instantânea")
+
+    free_after = shutil.disk_usage(backup.parent).free
+    return BackupResult(strategy, max(0, free_before - free_after))
+
+
+def write_backup_record(backup: Path, digest: Optional[str] = None) -> None:
+    """
+    Records the hash of a full backup so it can be verified before it
+    is restored. `digest` is computed when not given.
+    """
+    record = {
+        "hash_scheme": HASH_SCHEME,
+        "hash": digest or tree_hash_file(backup),
+        "size": backup.stat().st_size,
+    }
+    (backup.parent / RECORD_NAME).write_text(
+        json.dumps(record), encoding="utf-8"
+    )
+
+
+def has_backup(target: Path) -> bool:
+    parent = target.parent
+    return ((parent / DELTA_NAME).exists()
+            or ((parent / BACKUP_NAME).exists()
+                and (parent / RECORD_NAME).exists()))
+
+
+def restore_original(
+        target: Path,
+        progress: Optional[ProgressCallback] = None,
+) -> None:
+    """
+    Puts the original UntilThen.pck back in place from its delta or full
+    backup. The backup is verified against the hash recorded at install
+    time first, and the target is only ever swapped by an atomic rename.
+    """
+    parent = target.parent
+    delta = parent / DELTA_NAME
+    backup = parent / BACKUP_NAME
+    record_path = parent / RECORD_NAME
+
+    if delta.exists():
+        restored = parent / RESTORE_NAME
+        try:
+            restore_delta(delta, target, restored, progress)
+        except DeltaError as e:
+            raise RestoreError(str(e)) from e
+        os.replace(restored, target)
+        delta.unlink()
+        return
+
+    if not backup.exists():
+        raise RestoreError("Nenhum backup encontrado")
+    if not record_path.exists():
+        raise RestoreError("O backup não tem um registro para verificação")
+
+    record = json.loads(record_path.read_text(encoding="utf-8"))
+    if (record.get("hash_scheme") != HASH_SCHEME
+            or record.get("size") != backup.stat().st_size
+            or tree_hash_file(backup) != record.get("hash")):
+        raise RestoreError("O backup não confere com o original")
+
+    os.replace(backup, target)
+    record_path.unlink()
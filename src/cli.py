@@ -0,0 +1,244 @@
+import argparse
+import json
+import tempfile
+import zipfile
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from src.assets import TRANSLATION_FILES, open_payload, \
+    pck_explorer_payload
+from src.backup import BackupError, RestoreError, restore_original
+from src.engine import ArchiveOpener, BackupCreated, BackupExists, \
+    BackupUnverified, EntriesSkipped, InstallEvent, InstallRecovered, \
+    Installer, PackerError, PackerOutput, PackerProgress, PatchProgress, \
+    PatchResult, PreflightChecked, ToolchainCache, event_message
+from src.pck import PCKFormatError
+from src.resource_io import ResourceReader
+
+
+class _Reporter:
+    """
+    Prints installer events either as plain text or, with `json_lines`,
+    as one JSON object per line on stdout.
+    """
+
+    def __init__(self, json_lines: bool):
+        self._json_lines = json_lines
+        self._last_percent = -1
+
+    def event(self, event: str, text: Optional[str], **fields) -> None:
+        if self._json_lines:
+            print(json.dumps({"event": event, **fields}), flush=True)
+        elif text:
+            print(text, flush=True)
+
+    def on_event(self, event: InstallEvent) -> None:
+        text = event_message(event)
+        if isinstance(event, PatchProgress):
+            self._progress(event.done, event.total)
+        elif isinstance(event, PackerProgress):
+            self._packer_progress(event)
+        elif isinstance(event, PackerOutput):
+            self.event("packer_output", text, message=event.text)
+        elif isinstance(event, EntriesSkipped):
+            self.event(
+                "skipped", text, skipped=event.skipped, total=event.total
+            )
+        elif isinstance(event, BackupCreated):
+            self.event(
+                "backup",
+                text,
+                strategy=event.strategy,
+                extra_bytes=event.extra_bytes,
+            )
+        elif isinstance(event, BackupExists):
+            self.event("warning", text, message="backup already exists")
+        elif isinstance(event, BackupUnverified):
+            self.event("warning", text, message=event.reason)
+        elif isinstance(event, InstallRecovered):
+            self.event("recovered", text, action=event.action)
+        elif isinstance(event, PreflightChecked):
+            preflight = event.preflight
+            self.event(
+                "preflight",
+                text,
+                mode=preflight.mode,
+                needs=[
+                    {"path": str(need.path), "needed": need.needed,
+                     "free": need.free}
+                    for need in preflight.needs
+                ],
+                eta=preflight.eta,
+            )
+
+    def _progress(self, done: int, total: int) -> None:
+        percent = done * 100 // total if total else 100
+        if percent == self._last_percent and done < total:
+            return
+        self._last_percent = percent
+        self.event(
+            "progress",
+            f"Instalando arquivos de tradução... {percent}%",
+            done=done,
+            total=total,
+        )
+
+
+    def _packer_progress(self, event: PackerProgress) -> None:
+        percent = int(event.fraction * 100)
+        if percent == self._last_percent:
+            return
+        self._last_percent = percent
+        self.event(
+            "packer_progress",
+            f"Instalando arquivos de tradução... {percent}%",
+            fraction=event.fraction,
+            rate=event.rate,
+            eta=event.eta,
+        )
+
+
+def _translation_archive(files: Optional[Path]) -> ArchiveOpener:
+    if files is None:
+        return partial(open_payload, TRANSLATION_FILES)
+    return partial(ResourceReader, str(files))
+
+
+def _install_with_packer(
+        installer: Installer,
+        setup_version: str,
+) -> PatchResult:
+    """
+    Installs through the external packer, as the GUI does for PCKs the
+    native patcher does not understand.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        installer.preflight(Path(temp_dir), packer=True)
+        packer_dir, files_dir = installer.extract_for_packer(
+            Path(temp_dir),
+            partial(open_payload, pck_explorer_payload()),
+            ToolchainCache(setup_version),
+        )
+        installer.run_packer(packer_dir, files_dir)
+    return PatchResult(up_to_date=False)
+
+
+def _install(args, reporter: _Reporter, setup_version: str) -> int:
+    installer = Installer(
+        args.install,
+        _translation_archive(args.files),
+        demo=args.demo,
+        make_backup=args.backup,
+        on_event=reporter.on_event,
+    )
+    report = installer.report
+    try:
+        installer.prepare()
+        installer.preflight(Path(tempfile.gettempdir()))
+        try:
+            result = installer.install()
+        except PCKFormatError as error:
+            installer.rollback()
+            reporter.event(
+                "warning",
+                f"Aviso: {error}. Usando o empacotador externo.",
+                message=str(error),
+            )
+            result = _install_with_packer(installer, setup_version)
+    except (PCKFormatError, BackupError, PackerError, OSError,
+            zipfile.BadZipFile) as error:
+        installer.rollback()
+        report.finish("error", error)
+        reporter.event(
+            "error",
+            f"Erro: Falha ao aplicar a tradução ({error})\n"
+            + "\n".join(f"> {line}" for line in report.summary()),
+            message=str(error),
+            report=str(report.path) if report.path.exists() else None,
+        )
+        return 1
+
+    report.finish("up_to_date" if result.up_to_date else "success")
+    if result.up_to_date:
+        reporter.event(
+            "finished",
+            "Sucesso: A tradução já estava instalada. Nada foi alterado.",
+            changed=False,
+        )
+    else:
+        reporter.event(
+            "finished",
+            "Sucesso: Tradução aplicada com sucesso.",
+            changed=True,
+        )
+    return 0
+
+
+def run_cli(argv: list[str], setup_version: str = "") -> Optional[int]:
+    """
+    Handles the command line modes. Returns an exit code, or None when
+    the GUI should start. `setup_version` keys the packer cache.
+    """
+    parser = argparse.ArgumentParser()
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--install",
+        type=Path,
+        metavar="PCK",
+        help="instala a tradução no UntilThen.pck indicado, sem interface",
+    )
+    mode.add_argument(
+        "--uninstall",
+        type=Path,
+        metavar="PCK",
+        help="restaura o UntilThen.pck original a partir do backup",
+    )
+    parser.add_argument(
+        "--demo",
+        action="store_true",
+        help="instala os arquivos da versão demo",
+    )
+    parser.add_argument(
+        "--backup",
+        action="store_true",
+        help="guarda o original para poder desinstalar depois",
+    )
+    parser.add_argument(
+        "--files",
+        type=Path,
+        metavar="ZIP",
+        help="arquivo translation_files.zip a usar",
+    )
+    parser.add_argument(
+        "--json-progress",
+        action="store_true",
+        help="escreve o progresso como uma linha JSON por evento",
+    )
+    args, _ = parser.parse_known_args(argv)
+    reporter = _Reporter(args.json_progress)
+
+    if args.install is not None:
+        try:
+            return _install(args, reporter, setup_version)
+        except OSError as error:
+            # The translation archive itself could not be opened.
+            reporter.event("error", f"Erro: {error}", message=str(error))
+            return 1
+
+    if args.uninstall is not None:
+        try:
+            restore_original(args.uninstall)
+        except (RestoreError, OSError) as error:
+            reporter.event("error", f"Erro: {error}", message=str(error))
+            return 1
+
+        reporter.event(
+            "finished",
+            "Tradução desinstalada. O arquivo original foi restaurado.",
+            changed=True,
+        )
+        return 0
+
+    return None
+
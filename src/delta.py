@@ -0,0 +1,222 @@
+import json
+import lzma
+import os
+import struct
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.hashing import HASH_SCHEME, TreeHasher, tree_hash_file
+from src.pck import PCKEntry, ProgressCallback, copy_range, normalize_path, \
+    read_index
+
+DELTA_MAGIC = b"UTDELTA1"
+
+_META_SIZE = struct.Struct("<I")
+
+
+class DeltaError(Exception):
+    pass
+
+
+def create_delta(
+        source: Path,
+        delta_path: Path,
+        replaced: Iterable[str],
+) -> int:
+    """
+    Writes to `delta_path` what it takes to rebuild `source` after the
+    entries in `replaced` are patched: its header, file table, padding and
+    the original bytes of those entries, LZMA compressed. Every other
+    entry is referenced by path and read back from the patched PCK.
+
+    Returns the size of the delta file.
+    """
+    replaced = {normalize_path(path) for path in replaced}
+
+    with open(source, "rb") as src:
+        index = read_index(src)
+        original_size = src.seek(0, 2)
+
+    # Each segment is ["raw", offset, size] or ["entry", path, size].
+    segments: list[list] = []
+    cursor = 0
+
+    def raw(offset: int, size: int):
+        if segments and segments[-1][0] == "raw":
+            segments[-1][2] += size
+        else:
+            segments.append(["raw", offset, size])
+
+    entries: list[PCKEntry] = sorted(
+        (e for e in index.entries if e.size),
+        key=lambda e: e.offset,
+    )
+    for entry in entries:
+        start = index.file_base + entry.offset
+        if start < cursor:
+            raise DeltaError("Entradas sobrepostas no PCK")
+        if start > cursor:
+            raw(cursor, start - cursor)
+
+        if normalize_path(entry.path) in replaced:
+            raw(start, entry.size)
+        else:
+            segments.append(["entry", entry.path, entry.size])
+        cursor = start + entry.size
+
+    if cursor < original_size:
+        raw(cursor, original_size - cursor)
+
+    meta = json.dumps({
+        "original_size": original_size,
+        "hash_scheme": HASH_SCHEME,
+        "hash": tree_hash_file(source),
+        "segments": [
+            ["raw", seg[2]] if seg[0] == "raw" else seg for seg in segments
+        ],
+    }).encode("utf-8")
+
+    with open(source, "rb") as src, open(delta_path, "wb") as delta:
+        delta.write(DELTA_MAGIC)
+        delta.write(_META_SIZE.pack(len(meta)))
+        delta.write(meta)
+        with lzma.open(delta, "wb") as payload:
+            for segment in segments:
+                if segment[0] == "raw":
+                    src.seek(segment[1])
+                    copy_range(src, payload, segment[2])
+        return delta.tell()
+
+
+def _read_meta(delta) -> dict:
+    if delta.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+        raise DeltaError("Arquivo de backup diferencial inválido")
+    (meta_size,) = _META_SIZE.unpack(delta.read(_META_SIZE.size))
+    return json.loads(delta.read(meta_size))
+
+
+def extend_delta(
+        delta_path: Path,
+        patched: Path,
+        replaced: Iterable[str],
+) -> int:
+    """
+    Moves into the delta the original bytes of the entries in `replaced`
+    that it only references by path, before another install replaces
+    them in `patched` and the delta could no longer rebuild the original.
+    Those entries are read from `patched`, which must still hold them as
+    they were. Returns how many entries were moved.
+    """
+    replaced = {normalize_path(path) for path in replaced}
+
+    with open(delta_path, "rb") as delta:
+        try:
+            meta = _read_meta(delta)
+        except (ValueError, struct.error) as e:
+            raise DeltaError("Backup diferencial corrompido") from e
+    if not any(
+            segment[0] == "entry" and normalize_path(segment[1]) in replaced
+            for segment in meta["segments"]
+    ):
+        return 0
+
+    temp_path = delta_path.with_name(delta_path.name + ".tmp")
+    with open(delta_path, "rb") as delta, open(patched, "rb") as src:
+        _read_meta(delta)
+        index = read_index(src)
+        entries = index.entry_map()
+
+        # Each segment with the patched entry to copy it from, if moved.
+        segments: list[tuple[list, Optional[PCKEntry]]] = []
+        for segment in meta["segments"]:
+            if (segment[0] != "entry"
+                    or normalize_path(segment[1]) not in replaced):
+                segments.append((segment, None))
+                continue
+            _, path, size = segment
+            entry = entries.get(normalize_path(path))
+            if entry is None or entry.size != size:
+                raise DeltaError(f"Entrada ausente no PCK instalado: {path}")
+            segments.append((["raw", size], entry))
+
+        new_meta = json.dumps({
+            **meta,
+            "segments": [segment for segment, _ in segments],
+        }).encode("utf-8")
+
+        try:
+            with open(temp_path, "wb") as out:
+                out.write(DELTA_MAGIC)
+                out.write(_META_SIZE.pack(len(new_meta)))
+                out.write(new_meta)
+                with lzma.open(delta, "rb") as old_payload, \
+                        lzma.open(out, "wb") as payload:
+                    for segment, entry in segments:
+                        if entry is not None:
+                            src.seek(index.file_base + entry.offset)
+                            copy_range(src, payload, entry.size)
+                        elif segment[0] == "raw":
+                            copy_range(old_payload, payload, segment[1])
+                # The old delta is only replaced by a complete new one.
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_path, delta_path)
+        except lzma.LZMAError as e:
+            temp_path.unlink(missing_ok=True)
+            raise DeltaError("Backup diferencial corrompido") from e
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    return sum(entry is not None for _, entry in segments)
+
+
+def restore_delta(
+        delta_path: Path,
+        patched: Path,
+        output: Path,
+        progress: Optional[ProgressCallback] = None,
+) -> None:
+    """
+    Rebuilds the original PCK into `output` from `delta_path` and the
+    patched PCK, and checks it against the hash recorded at backup
+    time. `output` is removed when the check fails.
+    """
+    with open(delta_path, "rb") as delta, open(patched, "rb") as src:
+        meta = _read_meta(delta)
+        if meta.get("hash_scheme") != HASH_SCHEME:
+            raise DeltaError("Backup diferencial de versão desconhecida")
+        index = read_index(src)
+        entries = index.entry_map()
+        hasher = TreeHasher()
+        total = meta["original_size"]
+        done = 0
+
+        def advance(n: int):
+            nonlocal done
+            done += n
+            if progress:
+                progress(done, total)
+
+        try:
+            with open(output, "wb") as out, \
+                    lzma.open(delta, "rb") as payload:
+                for segment in meta["segments"]:
+                    if segment[0] == "raw":
+                        copy_range(payload, out, segment[1], advance, hasher)
+                        continue
+
+                    _, path, size = segment
+                    entry = entries.get(normalize_path(path))
+                    if entry is None or entry.size != size:
+                        raise DeltaError(
+                            f"Entrada ausente no PCK instalado: {path}"
+                        )
+                    src.seek(index.file_base + entry.offset)
+                    copy_range(src, out, size, advance, hasher)
+
+            if hasher.hexdigest() != meta["hash"]:
+                raise DeltaError("O arquivo restaurado não confere com o original")
+        except BaseException:
+            output.unlink(missing_ok=True)
+            raise
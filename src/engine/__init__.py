@@ -0,0 +1,50 @@
+from src.engine.events import BackupCreated, BackupExists, \
+    BackupUnverified, EntriesSkipped, EventCallback, ExtractProgress, \
+    InstallEvent, InstallRecovered, PackerOutput, PackerProgress, \
+    PatchProgress, PreflightChecked, StageStarted, event_message
+from src.engine.extract import ArchiveOpener, extract_archives
+from src.engine.installer import OUTPUT_NAME, Installer, recover_install
+from src.engine.journal import JOURNAL_NAME, InstallJournal
+from src.engine.metrics import REPORT_NAME, InstallReport, StageMetrics, \
+    StageTimer
+from src.engine.packer import PackerError
+from src.engine.packer_log import PackerLog
+from src.engine.patch import PatchResult
+from src.engine.preflight import InsufficientSpaceError, Preflight, \
+    SpaceNeed
+from src.engine.toolchain import ToolchainCache
+
+__all__ = [
+    "ArchiveOpener",
+    "BackupCreated",
+    "BackupExists",
+    "BackupUnverified",
+    "EntriesSkipped",
+    "EventCallback",
+    "ExtractProgress",
+    "InstallEvent",
+    "InsufficientSpaceError",
+    "InstallRecovered",
+    "InstallReport",
+    "InstallJournal",
+    "Installer",
+    "JOURNAL_NAME",
+    "OUTPUT_NAME",
+    "PackerError",
+    "PackerLog",
+    "PackerOutput",
+    "PackerProgress",
+    "PatchProgress",
+    "PatchResult",
+    "Preflight",
+    "PreflightChecked",
+    "REPORT_NAME",
+    "SpaceNeed",
+    "StageMetrics",
+    "StageStarted",
+    "StageTimer",
+    "ToolchainCache",
+    "event_message",
+    "extract_archives",
+    "recover_install",
+]
@@ -0,0 +1,117 @@
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Union
+
+from src.engine.preflight import Preflight
+from src.utils import format_file_size
+
+
+@dataclass(frozen=True)
+class StageStarted:
+    # "preflight", "toolchain", "extract", "patch", "packer", "commit" or
+    # "verify"
+    stage: str
+
+
+@dataclass(frozen=True)
+class PatchProgress:
+    done: int
+    total: int
+
+
+@dataclass(frozen=True)
+class ExtractProgress:
+    files_done: int
+    files_total: int
+    bytes_done: int
+    bytes_total: int
+    names: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class PackerProgress:
+    fraction: float  # below 1 until the packer exits
+    rate: Optional[float] = None  # bytes written per second, when known
+    eta: Optional[float] = None  # seconds left, when known
+
+
+@dataclass(frozen=True)
+class PackerOutput:
+    text: str  # a line the packer printed about a problem
+
+
+@dataclass(frozen=True)
+class EntriesSkipped:
+    skipped: int
+    total: int
+
+
+@dataclass(frozen=True)
+class BackupCreated:
+    strategy: str  # a BackupResult strategy, "delta" or "rename"
+    extra_bytes: int
+
+
+@dataclass(frozen=True)
+class BackupExists:
+    pass
+
+
+@dataclass(frozen=True)
+class BackupUnverified:
+    reason: str
+
+
+@dataclass(frozen=True)
+class PreflightChecked:
+    preflight: Preflight
+
+
+@dataclass(frozen=True)
+class InstallRecovered:
+    action: str  # "forward" when finished, "back" when undone
+
+
+InstallEvent = Union[
+    StageStarted,
+    PatchProgress,
+    ExtractProgress,
+    PackerProgress,
+    PackerOutput,
+    EntriesSkipped,
+    BackupCreated,
+    BackupExists,
+    BackupUnverified,
+    PreflightChecked,
+    InstallRecovered,
+]
+
+EventCallback = Callable[[InstallEvent], None]
+
+
+def event_message(event: InstallEvent) -> Optional[str]:
+    """
+    The log message the front ends show for `event`, or None for the
+    events that only drive progress.
+    """
+    if isinstance(event, EntriesSkipped):
+        return (f"Ignoradas {event.skipped} de {event.total}"
+                " entradas já atualizadas.")
+    if isinstance(event, BackupCreated) and event.strategy == "rename":
+        return "Sucesso: O arquivo de backup foi criado."
+    if isinstance(event, BackupCreated):
+        return ("Sucesso: O arquivo de backup foi criado"
+                f" ({event.strategy},"
+                f" {format_file_size(event.extra_bytes)} a mais em disco).")
+    if isinstance(event, BackupExists):
+        return "Aviso: O backup já existia. Nada foi alterado."
+    if isinstance(event, BackupUnverified):
+        return f"Aviso: Não foi possível verificar o backup ({event.reason})"
+    if isinstance(event, InstallRecovered):
+        if event.action == "forward":
+            return "Aviso: Uma instalação interrompida foi concluída."
+        return "Aviso: Uma instalação interrompida foi desfeita."
+    if isinstance(event, PreflightChecked):
+        return "\n".join(event.preflight.summary()) or None
+    if isinstance(event, PackerOutput):
+        return event.text
+    return None
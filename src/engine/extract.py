@@ -0,0 +1,87 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from src.progress import ProgressAggregator
+
+ArchiveOpener = Callable[[], BinaryIO]
+
+
+def _split(infos: list[zipfile.ZipInfo], parts: int) -> list[list[int]]:
+    """
+    Spreads the members over `parts` buckets of similar compressed size.
+    """
+    buckets = [[] for _ in range(max(1, min(parts, len(infos))))]
+    sizes = [0] * len(buckets)
+    order = sorted(
+        range(len(infos)),
+        key=lambda i: infos[i].compress_size,
+        reverse=True,
+    )
+    for index in order:
+        smallest = sizes.index(min(sizes))
+        buckets[smallest].append(index)
+        sizes[smallest] += infos[index].compress_size
+    return [sorted(bucket) for bucket in buckets if bucket]
+
+
+def _extract(
+        open_archive: ArchiveOpener,
+        dest_dir: Path,
+        indices: list[int],
+        progress: ProgressAggregator,
+):
+    # Each task reads through its own handle, so members decompress
+    # in parallel instead of queueing on a shared file position.
+    with open_archive() as reader, zipfile.ZipFile(reader) as zf:
+        infos = zf.infolist()
+        for index in indices:
+            info = infos[index]
+            info.filename = info.filename.replace('\\', '/')
+            zf.extract(info, str(dest_dir))
+            progress.add(info.filename, info.file_size)
+
+
+def extract_archives(
+        jobs: list[tuple[ArchiveOpener, Path]],
+        progress: ProgressAggregator,
+        max_workers: Optional[int] = None,
+) -> None:
+    """
+    Extracts every (open_archive, dest_dir) in `jobs` at the same time,
+    spreading the members of all archives over a thread pool.
+    """
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    tasks = []
+    total = 0
+    total_bytes = 0
+
+    for open_archive, dest_dir in jobs:
+        dest_dir = Path(dest_dir).resolve()
+        with open_archive() as reader, zipfile.ZipFile(reader) as zf:
+            infos = zf.infolist()
+
+        # ZipFile.extract is not safe against other threads creating
+        # the same parent folders, so the whole tree is made up front.
+        for info in infos:
+            name = info.filename.replace('\\', '/')
+            (dest_dir / name).parent.mkdir(parents=True, exist_ok=True)
+
+        for indices in _split(infos, max_workers):
+            tasks.append((open_archive, dest_dir, indices))
+        total += len(infos)
+        total_bytes += sum(info.file_size for info in infos)
+
+    progress.set_total(total, total_bytes)
+    progress.flush()
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        futures = [
+            pool.submit(_extract, *task, progress) for task in tasks
+        ]
+        for future in as_completed(futures):
+            future.result()
+
+    progress.flush()
@@ -0,0 +1,523 @@
+import os
+import shutil
+import stat
+import zipfile
+from pathlib import Path
+from typing import Optional, Sequence
+
+from src.backup import BACKUP_NAME, write_backup_record
+from src.engine.events import BackupCreated, BackupExists, \
+    BackupUnverified, EntriesSkipped, EventCallback, ExtractProgress, \
+    InstallEvent, InstallRecovered, PatchProgress, PreflightChecked, \
+    StageStarted
+from src.engine.extract import ArchiveOpener, extract_archives
+from src.engine.journal import InstallJournal
+from src.engine.metrics import REPORT_NAME, InstallReport
+from src.engine.packer import PackerError, PackerMonitor, packer_program, \
+    run_packer
+from src.engine.packer_log import PackerLog
+from src.engine.patch import PatchResult, backup_target, patch_translation
+from src.engine.preflight import MIN_PROBE_BYTES, PROBE_BYTES, Preflight, \
+    measure_throughput, plan_install, space_needs
+from src.engine.toolchain import ToolchainCache, bundle_hash
+from src.manifest import read_manifest_version
+from src.pck import AppendUndo, PCKFormatError, check_pck, \
+    read_install_marker, undo_append, write_install_marker
+from src.progress import EMIT_RATE, ProgressAggregator
+
+OUTPUT_NAME = "ModifiedPCK.pck"
+PACKER_VERSION = "2.2.4.1"
+
+# Patch progress is reported in steps of 1/1000 at most.
+_PROGRESS_STEPS = 1000
+
+
+class Installer:
+    """
+    Installs the translation into one UntilThen.pck, one step at a time,
+    without any GUI. Each step blocks, so callers run them on a worker
+    thread and follow along through `on_event`, which is called from
+    that thread.
+
+    The usual run is `prepare()`, `preflight()` then `install()`. When
+    the PCK cannot be patched natively, `extract_for_packer()` puts the
+    files on disk for the external packer and gets the packer itself,
+    and `run_packer()` runs it and swaps its output into place.
+    `rollback()` undoes what the current install changed.
+
+    Every step that changes the PCK is written ahead to an
+    InstallJournal, and `prepare()` uses it to finish or undo an install
+    that was interrupted.
+    """
+
+    def __init__(
+            self,
+            target: Path,
+            open_archive: ArchiveOpener,
+            demo: bool = False,
+            make_backup: bool = True,
+            on_event: Optional[EventCallback] = None,
+            throughput: Optional[float] = None,
+            progress_rate: float = EMIT_RATE,
+    ):
+        self.target = Path(target)
+        self.output = self.target.parent / OUTPUT_NAME
+        self.folder = "demo" if demo else "full"
+        self.make_backup = make_backup
+        # Bytes per second the target's disk writes, once measured.
+        self.throughput = throughput
+        # ExtractProgress events per second at most; math.inf sends one
+        # per extracted file.
+        self.progress_rate = progress_rate
+        self.marker: dict = {}
+        self.backup_strategy: Optional[str] = None
+        self._open_archive = open_archive
+        self._on_event = on_event
+        self._undo: Optional[AppendUndo] = None
+        self._last_step = -1
+        self.journal = InstallJournal(self.target)
+        self.packer_log = PackerLog()
+        self.report = InstallReport(
+            self.target.parent / REPORT_NAME, self.target, self.folder
+        )
+
+    def _emit(self, event: InstallEvent) -> None:
+        if self._on_event:
+            self._on_event(event)
+
+    def prepare(self) -> None:
+        """
+        Reads the translation version and finishes or undoes what a
+        previous, interrupted install left behind.
+        """
+        with self.report.stage("prepare"):
+            recovered = self.recover()
+            with self._open_archive() as reader, \
+                    zipfile.ZipFile(reader) as zf:
+                version = read_manifest_version(zf)
+            # Lets PickTargetPage tell which translation a PCK already has.
+            self.marker = {"version": version, "folder": self.folder}
+            self.output.unlink(missing_ok=True)
+
+        if recovered is not None:
+            self._emit(InstallRecovered(recovered))
+
+        if self.make_backup and backup_target(self.target, True) is None:
+            self._emit(BackupExists())
+
+    def estimate(self, temp_dir: Path, packer: bool = False) -> Preflight:
+        """
+        What the install will need: room on each filesystem it writes to
+        and, unless `throughput` is known, a short write to the target's
+        disk to estimate how long it will take. Nothing else is written,
+        so this can run before the user decides to install. `packer`
+        plans for the external packer.
+        """
+        backup = (
+                self.backup_strategy is None
+                and backup_target(self.target, self.make_backup) is not None
+        )
+        with self._open_archive() as reader, zipfile.ZipFile(reader) as zf:
+            mode, needs, write_bytes = plan_install(
+                self.target, zf, self.folder, backup, temp_dir, packer
+            )
+        needs = space_needs(needs)
+        if (self.throughput is None
+                and write_bytes >= MIN_PROBE_BYTES
+                and all(need.enough for need in needs)):
+            # The probe never writes more than the install itself.
+            self.throughput = measure_throughput(
+                self.target.parent, min(write_bytes, PROBE_BYTES)
+            )
+        return Preflight(mode, needs, write_bytes, self.throughput)
+
+    def preflight(self, temp_dir: Path, packer: bool = False) -> Preflight:
+        """
+        `estimate()`, checking before anything is written that each
+        filesystem has room for the install. Raises
+        InsufficientSpaceError.
+        """
+        self._emit(StageStarted("preflight"))
+        with self.report.stage("preflight"):
+            preflight = self.estimate(temp_dir, packer)
+
+        self._emit(PreflightChecked(preflight))
+        preflight.check()
+        return preflight
+
+    def patch(self, append: bool) -> PatchResult:
+        """
+        Patches the changed translation files in place (`append`) or into
+        `output`. Raises PCKFormatError when that is not possible.
+        """
+        self._emit(StageStarted("patch"))
+        self._last_step = -1
+        backup_dir = None
+        if self.backup_strategy is None:
+            backup_dir = backup_target(self.target, self.make_backup)
+
+        mode = "append" if append else "rebuild"
+        self.journal.begin(mode, self.marker, self.make_backup)
+        with self.report.stage(mode), \
+                self._open_archive() as reader, \
+                zipfile.ZipFile(reader) as zf:
+            result = patch_translation(
+                self.target,
+                self.output,
+                zf,
+                self.folder,
+                append,
+                self.marker,
+                backup_dir,
+                self._on_patch_progress,
+                self._on_skipped if append else None,
+                self._on_backup,
+                self.report,
+                self._on_undo if append else None,
+            )
+        self._undo = result.undo
+        if append or result.up_to_date:
+            # The PCK itself is complete; there is nothing to swap in.
+            self.journal.finish()
+        return result
+
+    def install(self) -> PatchResult:
+        """
+        Appends the translation in place, or rebuilds the whole PCK when
+        its file table has no room left, and swaps the rebuilt file in.
+        Raises PCKFormatError when neither is possible.
+        """
+        try:
+            result = self.patch(append=True)
+        except PCKFormatError:
+            self.rollback()
+            result = self.patch(append=False)
+            if not result.up_to_date:
+                self.commit()
+        return result
+
+    def extract(
+            self,
+            destination: Path,
+            extra: Sequence[tuple[ArchiveOpener, Path]] = (),
+            max_workers: Optional[int] = None,
+    ) -> Path:
+        """
+        Extracts the translation archive under `destination` and, at the
+        same time, any (open_archive, folder) in `extra`. Returns the
+        folder holding the files to pack.
+        """
+        self._emit(StageStarted("extract"))
+        files_dir = destination / "translation_files"
+        jobs = [(self._open_archive, files_dir), *extra]
+
+        with self.report.stage("unzip"):
+            extract_archives(jobs, self._extract_progress(), max_workers)
+        return files_dir / self.folder
+
+    def extract_for_packer(
+            self,
+            destination: Path,
+            open_bundle: ArchiveOpener,
+            cache: ToolchainCache,
+    ) -> tuple[Path, Path]:
+        """
+        Extracts the translation archive under `destination` and gets the
+        external packer. It comes from `cache` when a verified copy of
+        this bundle is there; otherwise the bundle is extracted into the
+        cache along with the translation. Returns the packer's folder and
+        the folder holding the files to pack.
+        """
+        self._emit(StageStarted("toolchain"))
+        with self.report.stage("toolchain"):
+            digest = bundle_hash(open_bundle)
+            packer_dir = cache.lookup(digest)
+        if packer_dir is not None:
+            return packer_dir, self.extract(destination)
+
+        staging = cache.stage(digest)
+        try:
+            files_dir = self.extract(destination, [(open_bundle, staging)])
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        with self.report.stage("cache"):
+            packer_dir = cache.publish(staging, open_bundle, digest)
+        return packer_dir, files_dir
+
+    def packer_command(
+            self,
+            packer: Path,
+            files_dir: Path,
+    ) -> tuple[Path, list[str]]:
+        """
+        Program and arguments that make GodotPCKExplorer write the patched
+        PCK to `output`. Starts the journal, as the packer is run next.
+        """
+        if os.name != "nt":
+            with self.report.stage("chmod"):
+                mode = packer.stat().st_mode
+                if not (mode & stat.S_IXUSR):
+                    packer.chmod(mode | stat.S_IXUSR)
+
+        self.journal.begin("packer", self.marker, self.make_backup)
+        return packer.absolute().resolve(), [
+            "-pc",
+            str(self.target.absolute().resolve()),
+            str(files_dir.absolute().resolve()),
+            str(self.output.absolute().resolve()),
+            PACKER_VERSION,
+        ]
+
+    def packer_output_size(self, files_dir: Path) -> int:
+        """
+        Roughly how large the PCK the packer writes from `files_dir` will
+        be: the target plus every file. Files that replace an entry are
+        counted twice, so the output usually ends up smaller.
+        """
+        return self.target.stat().st_size + sum(
+            path.stat().st_size
+            for path in files_dir.rglob("*")
+            if path.is_file()
+        )
+
+    def run_packer(self, packer_dir: Path, files_dir: Path) -> None:
+        """
+        Runs the external packer in `packer_dir` on the files in
+        `files_dir`, reporting PackerProgress and PackerOutput, and swaps
+        the PCK it writes in with `commit()`. Everything it prints goes to
+        `packer_log`. Rolls the install back on failure, raising
+        PackerError when the packer cannot be started or writes no PCK.
+        """
+        try:
+            self._run_packer(packer_dir, files_dir)
+            self.commit(mark=True)
+        except BaseException:
+            # The user sees this install fail; the next launch must not
+            # report it as interrupted.
+            self.rollback()
+            raise
+
+    def _run_packer(self, packer_dir: Path, files_dir: Path) -> None:
+        self._emit(StageStarted("packer"))
+        try:
+            program, arguments = self.packer_command(
+                packer_program(packer_dir), files_dir
+            )
+        except OSError as e:
+            raise PackerError(
+                f"Falha ao tentar abrir o empacotador ({e})"
+            ) from e
+        monitor = PackerMonitor(
+            self.output, self.packer_output_size(files_dir)
+        )
+
+        self.packer_log.open()
+        stage = self.report.start("packer")
+        try:
+            exit_code = run_packer(
+                program, arguments, monitor, self.packer_log, self._emit
+            )
+        except OSError as e:
+            raise PackerError(
+                f"Falha ao tentar abrir o empacotador ({e})"
+            ) from e
+        finally:
+            self.packer_log.close()
+            stage.stop(
+                bytes_written=(self.output.stat().st_size
+                               if self.output.exists() else 0),
+                child=True,
+            )
+            self.report.packer_log = list(self.packer_log.tail)
+            self.report.packer_log_path = self.packer_log.path
+
+        if not self.output.exists():
+            raise PackerError(
+                "O arquivo de tradução não foi gerado pelo empacotador."
+                f"\nCódigo: {exit_code}"
+            )
+
+    def commit(self, mark: bool = False) -> None:
+        """
+        Moves the rebuilt PCK over the target. Without an earlier backup,
+        the original is renamed into one instead, and hashed so it can be
+        verified on uninstall. `mark` adds the install marker first, for
+        output written by the external packer.
+        """
+        self._emit(StageStarted("commit"))
+        if not self.output.exists():
+            raise FileNotFoundError(
+                "O arquivo de tradução não foi gerado pelo empacotador"
+            )
+        if mark:
+            write_install_marker(self.output, self.marker)
+        with open(self.output, "r+b") as file:
+            # The data must be on disk before the rename makes it the game's.
+            os.fsync(file.fileno())
+        check_pck(self.output)
+        self.journal.record("output_ready")
+
+        backup = self.target.parent / BACKUP_NAME
+        renamed_backup = (
+                self.backup_strategy is None
+                and backup_target(self.target, self.make_backup) is not None
+        )
+        with self.report.stage("replace"):
+            self._swap(renamed_backup)
+        self.journal.finish()
+        if renamed_backup:
+            self._on_backup("rename", 0)
+
+        if renamed_backup:
+            self._emit(StageStarted("verify"))
+            try:
+                with self.report.stage("verify"):
+                    write_backup_record(backup)
+            except OSError as e:
+                # The translation is in place; only the uninstall check
+                # is lost.
+                self._emit(BackupUnverified(str(e)))
+
+    def rollback(self) -> None:
+        """
+        Removes a partially written `output` and truncates a PCK patched
+        in place back to its original bytes.
+        """
+        self.output.unlink(missing_ok=True)
+        undo = self._undo
+        if undo is None and "append" in self.journal.read():
+            # The append failed after it started writing, before it could
+            # hand its undo record back; the saved one is used instead.
+            undo = AppendUndo.load(self.journal.undo_path)
+        if undo is not None:
+            undo_append(self.target, undo)
+            self._undo = None
+        self.journal.finish()
+
+    def recover(self) -> Optional[str]:
+        """
+        Finishes or undoes an install that was interrupted, going by the
+        journal. A complete `output` is swapped in rather than built
+        again. Returns "forward" or "back", or None when no install was
+        interrupted.
+        """
+        steps = self.journal.read()
+        if not steps:
+            self.journal.finish()
+            return None
+
+        begin = steps.get("begin", {})
+        marker = begin.get("marker")
+        backup = self.target.parent / BACKUP_NAME
+
+        if "swap" in steps:
+            rename_backup = steps["swap"].get("rename_backup", False)
+        elif self._is_complete(self.output, marker):
+            rename_backup = (
+                    begin.get("make_backup", False)
+                    and backup_target(self.target, True) is not None
+            )
+        else:
+            rename_backup = None
+
+        if rename_backup is not None and self.output.exists():
+            self._swap(rename_backup)
+            action = "forward"
+        elif not self.target.exists() and backup.exists():
+            # The original was moved aside, but nothing took its place.
+            os.replace(backup, self.target)
+            action = "back"
+        elif "append" in steps and not self._is_complete(self.target, marker):
+            undo_append(self.target, AppendUndo.load(self.journal.undo_path))
+            action = "back"
+        elif "swap" in steps or "append" in steps:
+            action = "forward"
+        else:
+            action = "back"
+
+        # Also when the swap was done but not its record, so uninstall
+        # still offers the original.
+        if action == "forward" and rename_backup and backup.exists():
+            try:
+                write_backup_record(backup)
+            except OSError:
+                pass
+
+        self.output.unlink(missing_ok=True)
+        self.journal.finish()
+        return action
+
+    def _swap(self, rename_backup: bool) -> None:
+        """
+        Moves `output` over the target, first renaming the original into
+        the backup when `rename_backup`. Recorded, so it can be redone.
+        """
+        backup = self.target.parent / BACKUP_NAME
+        self.journal.record("swap", rename_backup=rename_backup)
+        if rename_backup and self.target.exists():
+            # The original is kept whole, so it costs no extra space.
+            os.replace(self.target, backup)
+        try:
+            os.replace(self.output, self.target)
+        except OSError:
+            if rename_backup and not self.target.exists():
+                # Never leave the game without a PCK.
+                os.replace(backup, self.target)
+            raise
+
+    @staticmethod
+    def _is_complete(path: Path, marker: Optional[dict]) -> bool:
+        """
+        Whether `path` is a whole PCK carrying this install's marker.
+        """
+        if marker is None or not path.is_file():
+            return False
+        try:
+            check_pck(path)
+            with open(path, "rb") as file:
+                return read_install_marker(file) == marker
+        except (OSError, PCKFormatError):
+            return False
+
+    def _on_patch_progress(self, done: int, total: int):
+        step = done * _PROGRESS_STEPS // total if total else 0
+        if step != self._last_step:
+            self._last_step = step
+            self._emit(PatchProgress(done, total))
+
+    def _on_skipped(self, skipped: int, total: int):
+        self._emit(EntriesSkipped(skipped, total))
+
+    def _on_undo(self, undo: AppendUndo):
+        undo.save(self.journal.undo_path)
+        self.journal.record("append")
+
+    def _on_backup(self, strategy: str, extra_bytes: int):
+        self.backup_strategy = strategy
+        self._emit(BackupCreated(strategy, extra_bytes))
+
+    def _extract_progress(self) -> ProgressAggregator:
+        return ProgressAggregator(
+            lambda snapshot: self._emit(ExtractProgress(
+                snapshot.files_done,
+                snapshot.files_total,
+                snapshot.bytes_done,
+                snapshot.bytes_total,
+                snapshot.names,
+            )),
+            self.progress_rate,
+        )
+
+
+def _no_archive():
+    raise OSError("Nenhum arquivo de tradução foi indicado")
+
+
+def recover_install(target: Path) -> Optional[str]:
+    """
+    `Installer.recover()` for the PCK at `target`, which need not exist,
+    before any install of it is started. Lets the pages finish or undo
+    an interrupted install as soon as its folder is known.
+    """
+    return Installer(target, _no_archive).recover()
@@ -0,0 +1,97 @@
+import json
+import os
+from pathlib import Path
+
+JOURNAL_NAME = "UntilThen.pck.journal"
+UNDO_NAME = "UntilThen.pck.undo"
+
+
+def _fsync_dir(path: Path) -> None:
+    """
+    Makes files created, renamed or removed in `path` survive a crash.
+    Windows has no way to do this, nor a need for it.
+    """
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class InstallJournal:
+    """
+    Write-ahead log of the install that is changing a PCK, kept next to
+    it. Each step is recorded, and synced to disk, before it is taken,
+    so that a later run can tell how far an interrupted install got and
+    finish or undo it. The journal only exists while an install is in
+    progress.
+    """
+
+    def __init__(self, target: Path):
+        self.path = target.parent / JOURNAL_NAME
+        self.undo_path = target.parent / UNDO_NAME
+
+    def exists(self) -> bool:
+        """
+        Whether an install of this PCK was interrupted, which is cheap
+        enough to ask of any folder the user points at.
+        """
+        return self.path.exists()
+
+    def begin(self, mode: str, marker: dict, make_backup: bool) -> None:
+        """
+        Starts a new journal for an install in `mode` ("append",
+        "rebuild" or "packer").
+        """
+        with open(self.path, "w", encoding="utf-8") as file:
+            self._write(file, {
+                "step": "begin",
+                "mode": mode,
+                "marker": marker,
+                "make_backup": make_backup,
+            })
+        _fsync_dir(self.path.parent)
+
+    def record(self, step: str, **fields) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            self._write(file, {"step": step, **fields})
+
+    def read(self) -> dict[str, dict]:
+        """
+        The recorded steps by name; empty when no install was
+        interrupted. A record cut short by a crash is ignored.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return {}
+
+        steps = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if isinstance(record, dict) and "step" in record:
+                steps[record["step"]] = record
+        return steps
+
+    def finish(self) -> None:
+        """
+        Ends the install; nothing is left to finish or undo.
+        """
+        existed = self.path.exists()
+        self.path.unlink(missing_ok=True)
+        self.undo_path.unlink(missing_ok=True)
+        if existed:
+            _fsync_dir(self.path.parent)
+
+    @staticmethod
+    def _write(file, record: dict) -> None:
+        file.write(json.dumps(record) + "\n")
+        file.flush()
+        os.fsync(file.fileno())
+
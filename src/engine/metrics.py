@@ -0,0 +1,241 @@
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from src.utils import format_file_size
+
+REPORT_NAME = "UntilThen.pck.report.json"
+
+
+def _current_process():
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    return kernel32.GetCurrentProcess()
+
+
+def _io_counters() -> Optional[tuple[int, int]]:
+    """
+    Bytes this process has read and written so far, pipes and all, or
+    None where that is not known.
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/io", encoding="ascii") as file:
+                fields = dict(
+                    line.split(": ") for line in file.read().splitlines()
+                )
+            return int(fields["rchar"]), int(fields["wchar"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    if sys.platform == "win32":
+        import ctypes
+
+        class IoCounters(ctypes.Structure):
+            _fields_ = [
+                ("ReadOperationCount", ctypes.c_ulonglong),
+                ("WriteOperationCount", ctypes.c_ulonglong),
+                ("OtherOperationCount", ctypes.c_ulonglong),
+                ("ReadTransferCount", ctypes.c_ulonglong),
+                ("WriteTransferCount", ctypes.c_ulonglong),
+                ("OtherTransferCount", ctypes.c_ulonglong),
+            ]
+
+        counters = IoCounters()
+        if ctypes.windll.kernel32.GetProcessIoCounters(
+                _current_process(), ctypes.byref(counters)
+        ):
+            return counters.ReadTransferCount, counters.WriteTransferCount
+    return None
+
+
+def _peak_rss(children: bool = False) -> Optional[int]:
+    """
+    Peak resident memory in bytes of this process or, with `children`,
+    of the largest child process waited for.
+    """
+    try:
+        import resource
+    except ImportError:
+        if children or sys.platform != "win32":
+            return None
+        import ctypes
+
+        class MemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", ctypes.c_ulong),
+                ("PageFaultCount", ctypes.c_ulong),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = MemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+                _current_process(),
+                ctypes.byref(counters),
+                counters.cb,
+        ):
+            return counters.PeakWorkingSetSize
+        return None
+
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    seconds: Optional[float] = None  # None while the stage is running
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+    peak_rss: Optional[int] = None  # highest so far, not just this stage
+
+    def summary(self) -> str:
+        if self.seconds is None:
+            return f"{self.name}: não terminou"
+
+        parts = [f"{self.seconds:.2f} s"]
+        if self.bytes_read is not None:
+            parts.append(f"{format_file_size(self.bytes_read)} lidos")
+        if self.bytes_written is not None:
+            parts.append(f"{format_file_size(self.bytes_written)} escritos")
+        if self.peak_rss is not None:
+            parts.append(
+                f"pico de {format_file_size(self.peak_rss)} de memória"
+            )
+        return f"{self.name}: " + ", ".join(parts)
+
+
+class StageTimer:
+    """
+    Measures one stage from its creation until `stop()`.
+    """
+
+    def __init__(self, report: "InstallReport", metrics: StageMetrics):
+        self._report = report
+        self._metrics = metrics
+        self._start = time.perf_counter()
+        self._io = _io_counters()
+
+    def stop(
+            self,
+            bytes_written: Optional[int] = None,
+            child: bool = False,
+    ) -> None:
+        """
+        Ends the stage. `child` measures a child process instead of this
+        one; its output size can be given as `bytes_written`.
+        """
+        metrics = self._metrics
+        metrics.seconds = time.perf_counter() - self._start
+
+        io = _io_counters()
+        if not child and io is not None and self._io is not None:
+            metrics.bytes_read = io[0] - self._io[0]
+            metrics.bytes_written = io[1] - self._io[1]
+        if bytes_written is not None:
+            metrics.bytes_written = bytes_written
+        metrics.peak_rss = _peak_rss(children=child)
+        self._report.save()
+
+
+class InstallReport:
+    """
+    Timing, I/O and memory of every install stage. It is saved to `path`
+    as each stage starts and ends, so a stuck install still leaves a
+    report naming the stage it is stuck in.
+    """
+
+    def __init__(self, path: Optional[Path], target: Path, folder: str):
+        self.path = path
+        self.stages: list[StageMetrics] = []
+        self.outcome = "running"
+        self.error: Optional[str] = None
+        self.packer_log: list[str] = []
+        self.packer_log_path: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._info = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "target": str(target),
+            "folder": folder,
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        }
+
+    def start(self, name: str) -> StageTimer:
+        metrics = StageMetrics(name)
+        with self._lock:
+            self.stages.append(metrics)
+        self.save()
+        return StageTimer(self, metrics)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTimer]:
+        timer = self.start(name)
+        try:
+            yield timer
+        finally:
+            timer.stop()
+
+    def finish(
+            self,
+            outcome: str,  # "success", "up_to_date" or "error"
+            error: Union[BaseException, str, None] = None,
+    ) -> None:
+        self.outcome = outcome
+        self.error = str(error) if error is not None else None
+        self.save()
+
+    def summary(self) -> list[str]:
+        with self._lock:
+            return [stage.summary() for stage in self.stages]
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+
+        with self._lock:
+            data = {
+                **self._info,
+                "outcome": self.outcome,
+                "error": self.error,
+                "stages": [asdict(stage) for stage in self.stages],
+                "packer_log": list(self.packer_log),
+                "packer_log_path": (str(self.packer_log_path)
+                                    if self.packer_log_path else None),
+            }
+            try:
+                self.path.write_text(
+                    json.dumps(data, indent=2), encoding="utf-8"
+                )
+            except OSError:
+                # The report is only a diagnostic aid.
+                pass
+
+
+def measure(report: Optional[InstallReport], name: str):
+    """
+    `report.stage(name)`, or a no-op when there is no report.
+    """
+    return report.stage(name) if report is not None else nullcontext()
@@ -0,0 +1,167 @@
+import os
+import platform
+import queue
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from src.engine.events import EventCallback, PackerOutput, PackerProgress
+from src.engine.packer_log import PackerLog
+from src.progress import TransferRate
+
+# How often the size of the PCK the packer is writing is checked.
+POLL_SECONDS = 0.5
+
+# Progress the packer prints, e.g. "[ 42%]" or "42.5 %".
+_PERCENT_PATTERN = re.compile(r"(\d{1,3}(?:[.,]\d+)?)\s*%")
+_PROBLEM_WORDS = ("Error", "Exception", "Fail")
+_READ_SIZE = 64 * 1024
+
+# The packer is a console program; it must not open a window of its own.
+_CREATION_FLAGS = (subprocess.CREATE_NO_WINDOW
+                   if platform.system() == "Windows" else 0)
+
+
+class PackerError(Exception):
+    pass
+
+
+def packer_program(folder: Path) -> Path:
+    if platform.system() == "Windows":
+        return folder / "GodotPCKExplorer.Console.exe"
+    return folder / "GodotPCKExplorer.Console"
+
+
+class PackerMonitor:
+    """
+    Follows a running packer. Its output is split into lines, and how far
+    it got comes from the size of the PCK it is writing or the last
+    percentage it printed, whichever is further along: the packer only
+    tells now and then, if at all.
+    """
+
+    def __init__(self, output: Path, expected_size: int):
+        self.output = output
+        self.expected_size = expected_size
+        self.percent = 0.0
+        self._pending = b""
+        self._rate = TransferRate()
+        self._started = time.monotonic()
+
+    def feed(self, data: bytes) -> list[str]:
+        """
+        The complete lines `data` ends, without the blank ones. Progress
+        redrawn with a carriage return counts as a line too.
+        """
+        data = (self._pending + data).replace(b"\r", b"\n")
+        *lines, self._pending = data.split(b"\n")
+        return self._parse(lines)
+
+    def close(self) -> list[str]:
+        # The last line may not end in a newline.
+        lines, self._pending = [self._pending], b""
+        return self._parse(lines)
+
+    def progress(self) -> Optional[PackerProgress]:
+        """
+        How far the packer got, or None until it moves.
+        """
+        try:
+            written = os.stat(self.output).st_size
+        except OSError:
+            written = 0
+        self._rate.update(written)
+
+        fraction = written / self.expected_size if self.expected_size else 0
+        fraction = max(fraction, self.percent / 100)
+        if not fraction:
+            return None
+        # The expected size is an upper bound, so only the packer exiting
+        # completes it.
+        fraction = min(fraction, 0.99)
+
+        rate = self._rate.rate
+        if rate:
+            eta = self._rate.eta(int(self.expected_size * (1 - fraction)))
+        else:
+            elapsed = time.monotonic() - self._started
+            eta = elapsed * (1 - fraction) / fraction
+        return PackerProgress(fraction, rate, eta)
+
+    def _parse(self, lines: list[bytes]) -> list[str]:
+        texts = []
+        for line in lines:
+            text = line.decode(errors="replace").strip()
+            if not text:
+                continue
+            match = _PERCENT_PATTERN.search(text)
+            if match:
+                percent = float(match.group(1).replace(",", "."))
+                self.percent = max(self.percent, min(percent, 100.0))
+            texts.append(text)
+        return texts
+
+
+def _read_output(stream: BinaryIO, chunks: queue.SimpleQueue) -> None:
+    # Everything available is read at once, rather than line by line, so
+    # a chatty packer costs few calls.
+    with stream:
+        while data := stream.read1(_READ_SIZE):
+            chunks.put(data)
+    chunks.put(None)
+
+
+def run_packer(
+        program: Path,
+        arguments: list[str],
+        monitor: PackerMonitor,
+        log: PackerLog,
+        emit: EventCallback,
+) -> int:
+    """
+    Runs the packer until it exits and returns its exit code. Every line
+    it prints goes to `log`, and the ones about a problem are emitted as
+    PackerOutput along with PackerProgress. A second thread only reads
+    the output, so events are all emitted from the calling thread.
+    Raises OSError when the packer cannot be started.
+    """
+    process = subprocess.Popen(
+        [str(program), *arguments],
+        cwd=program.parent,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        creationflags=_CREATION_FLAGS,
+    )
+    chunks = queue.SimpleQueue()
+    threading.Thread(
+        target=_read_output, args=(process.stdout, chunks), daemon=True
+    ).start()
+
+    def handle(lines: list[str]):
+        for text in lines:
+            log.write(text)
+            if any(word in text for word in _PROBLEM_WORDS):
+                emit(PackerOutput(text))
+
+    next_poll = time.monotonic() + POLL_SECONDS
+    while True:
+        try:
+            data = chunks.get(timeout=max(0.0, next_poll - time.monotonic()))
+        except queue.Empty:
+            data = b""
+        if data is None:
+            break
+        handle(monitor.feed(data))
+
+        if time.monotonic() >= next_poll:
+            next_poll = time.monotonic() + POLL_SECONDS
+            progress = monitor.progress()
+            if progress is not None:
+                emit(progress)
+
+    handle(monitor.close())
+    return process.wait()
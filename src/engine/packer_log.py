@@ -0,0 +1,123 @@
+import logging
+import queue
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, \
+    RotatingFileHandler
+from pathlib import Path
+from typing import Optional
+
+from src.utils import user_cache_dir
+
+LOG_FOLDER = "logs"
+LOG_NAME = "packer.log"
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+TAIL_LINES = 5
+
+
+class _BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    Leaves each line in the file's buffer instead of flushing it, which
+    would mean a write call per line. The stock handler also seeks to the
+    end of the file before every record to decide on a rollover, which
+    flushes it too, so the size written is counted here instead. The
+    buffer is flushed on rollover and on close.
+    """
+
+    def __init__(self, filename: Path, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._size = self.stream.seek(0, 2)
+        self._record_size = 0
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        # Characters rather than bytes, as the stock handler counts them.
+        self._record_size = len(self.format(record)) + len(self.terminator)
+        return (0 < self.maxBytes <= self._size + self._record_size
+                and self._size > 0)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._size = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        super().emit(record)
+        self._size += self._record_size
+
+    def flush(self) -> None:
+        pass
+
+
+class PackerLog:
+    """
+    Everything the external packer prints. The last `tail` lines are kept
+    in memory for the UI and the install report, and every line goes to a
+    rotating log file, by default in the user cache directory. The file is
+    written by a background thread, so a chatty packer costs the caller
+    no disk I/O. Without a writable log folder only the tail is kept, and
+    `path` is None.
+    """
+
+    def __init__(
+            self,
+            path: Optional[Path] = None,
+            tail: int = TAIL_LINES,
+            max_bytes: int = MAX_LOG_BYTES,
+            backups: int = LOG_BACKUPS,
+    ):
+        self._log_path = (path if path is not None
+                          else user_cache_dir() / LOG_FOLDER / LOG_NAME)
+        self.path: Optional[Path] = None
+        self.tail: deque[str] = deque(maxlen=tail)
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._logger: Optional[logging.Logger] = None
+        self._listener: Optional[QueueListener] = None
+
+    def open(self) -> None:
+        """
+        Starts a new run in the log, rolling the previous one over.
+        """
+        self.close()
+        self.tail.clear()
+        self.path = None
+        try:
+            self._log_path.parent.mkdir(parents=True, exist_ok=True)
+            handler = _BufferedRotatingFileHandler(
+                self._log_path,
+                maxBytes=self._max_bytes,
+                backupCount=self._backups,
+                encoding="utf-8",
+            )
+            if self._log_path.stat().st_size:
+                handler.doRollover()
+        except OSError:
+            return
+        self.path = self._log_path
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        records = queue.SimpleQueue()
+        self._logger = logging.getLogger(__name__)
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(QueueHandler(records))
+        self._listener = QueueListener(records, handler)
+        self._listener.start()
+
+    def write(self, line: str) -> None:
+        self.tail.append(line)
+        if self._logger is not None:
+            self._logger.info(line)
+
+    def close(self) -> None:
+        """
+        Waits for the pending lines to reach the file and closes it.
+        """
+        if self._listener is None:
+            return
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+        self._listener = None
+        self._logger = None
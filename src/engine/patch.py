@@ -0,0 +1,172 @@
+import zipfile
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from src.backup import BACKUP_NAME, DELTA_NAME, BackupError, \
+    create_backup, write_backup_record
+from src.delta import DeltaError, create_delta, extend_delta
+from src.engine.metrics import InstallReport, measure
+from src.manifest import changed_entries, read_manifest
+from src.pck import AppendUndo, PCKFormatError, PatchEntry, \
+    ProgressCallback, append_patches, build_patched_pck, fits_in_place, \
+    read_index, read_install_marker, write_install_marker
+
+SkippedCallback = Callable[[int, int], None]  # skipped, total
+BackupCallback = Callable[[str, int], None]  # strategy, extra bytes
+
+
+@dataclass
+class PatchResult:
+    up_to_date: bool
+    undo: Optional[AppendUndo] = None  # set when patched in place
+
+
+def zip_entries(zf: zipfile.ZipFile, folder: str) -> Iterator[PatchEntry]:
+    """
+    Yields the files under `folder` as patch entries whose streams are
+    decompressed straight from the archive when the writer opens them.
+    """
+    prefix = folder + "/"
+    for info in zf.infolist():
+        name = info.filename.replace('\\', '/')
+        if not name.startswith(prefix) or name.endswith("/"):
+            continue
+        yield PatchEntry(
+            name[len(prefix):],
+            info.file_size,
+            partial(zf.open, info),
+        )
+
+
+def backup_target(target: Path, make_backup: bool) -> Optional[Path]:
+    """
+    Folder to back the original up into, or None when no backup should
+    be made, either because none was asked for or one already exists.
+    """
+    if not make_backup:
+        return None
+
+    parent = target.parent
+    if (parent / BACKUP_NAME).exists() or (parent / DELTA_NAME).exists():
+        return None
+    return parent
+
+
+def make_backup(
+        source: Path,
+        backup_dir: Path,
+        append: bool,
+        patches: list[PatchEntry],
+        on_backup: Optional[BackupCallback] = None,
+) -> None:
+    backup = backup_dir / BACKUP_NAME
+    delta = backup_dir / DELTA_NAME
+
+    # A reflink shares every block, so a full copy is only kept when
+    # it is free; otherwise just the bytes the patch replaces are kept.
+    try:
+        result = create_backup(
+            source, backup, in_place=True, allow_copy=False
+        )
+        write_backup_record(backup)
+        if on_backup:
+            on_backup(result.strategy, result.extra_bytes)
+        return
+    except BackupError:
+        pass
+
+    try:
+        size = create_delta(
+            source, delta, [patch.path for patch in patches]
+        )
+        if on_backup:
+            on_backup("delta", size)
+        return
+    except DeltaError:
+        delta.unlink(missing_ok=True)
+
+    result = create_backup(source, backup, in_place=append)
+    write_backup_record(backup)
+    if on_backup:
+        on_backup(result.strategy, result.extra_bytes)
+
+
+def extend_backup(source: Path, patches: list[PatchEntry]) -> None:
+    """
+    Keeps a delta backup left by an earlier install working. The delta
+    reads the entries it did not replace back from the installed PCK, so
+    their original bytes are moved into it before this install replaces
+    them. Raises BackupError when that is not possible, since the
+    original could not be restored afterwards.
+    """
+    delta = source.parent / DELTA_NAME
+    if not delta.exists():
+        return
+    try:
+        extend_delta(delta, source, [patch.path for patch in patches])
+    except (DeltaError, OSError) as e:
+        raise BackupError(
+            f"Não foi possível atualizar o backup diferencial ({e})."
+            " A instalação foi cancelada para que o original ainda possa"
+            " ser restaurado."
+        ) from e
+
+
+def patch_translation(
+        source: Path,
+        output: Path,
+        zf: zipfile.ZipFile,
+        folder: str,
+        append: bool,
+        marker: dict,
+        backup_dir: Optional[Path],
+        progress: Optional[ProgressCallback] = None,
+        on_skipped: Optional[SkippedCallback] = None,
+        on_backup: Optional[BackupCallback] = None,
+        report: Optional[InstallReport] = None,
+        on_undo: Optional[Callable[[AppendUndo], None]] = None,
+) -> PatchResult:
+    """
+    Patches the translation files under `folder` of `zf` into `source`,
+    skipping the ones the PCK already holds. With `append` the changed
+    files are written at the end of `source` itself; otherwise a new PCK
+    is built at `output` and `source` is left untouched.
+
+    Raises PCKFormatError when the PCK cannot be patched natively, or
+    when appending would not fit its file table.
+    """
+    patches = list(zip_entries(zf, folder))
+    with open(source, "rb") as file:
+        index = read_index(file)
+        installed = read_install_marker(file)
+
+    changed = changed_entries(index, patches, read_manifest(zf, folder))
+    if on_skipped:
+        on_skipped(len(patches) - len(changed), len(patches))
+    if not changed:
+        if installed != marker:
+            write_install_marker(source, marker)
+        return PatchResult(up_to_date=True)
+
+    if append and not fits_in_place(index, changed):
+        # Found out before the backup: for a rebuild, renaming or linking
+        # the original suffices where an append needs a copy.
+        raise PCKFormatError("Sem espaço no índice do PCK")
+
+    if backup_dir is not None:
+        with measure(report, "backup"):
+            make_backup(source, backup_dir, append, changed, on_backup)
+    elif (source.parent / DELTA_NAME).exists():
+        with measure(report, "backup"):
+            extend_backup(source, changed)
+
+    if append:
+        undo = append_patches(source, changed, progress, on_undo)
+        write_install_marker(source, marker)
+        return PatchResult(up_to_date=False, undo=undo)
+
+    build_patched_pck(source, output, changed, progress)
+    write_install_marker(output, marker)
+    return PatchResult(up_to_date=False)
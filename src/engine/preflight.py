@@ -0,0 +1,189 @@
+import os
+import shutil
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from src.engine.patch import zip_entries
+from src.manifest import changed_entries, read_manifest
+from src.pck import PCK_PADDING, PCKEntry, PCKFormatError, \
+    directory_size, fits_in_place, normalize_path, read_index
+from src.utils import format_duration, format_file_size
+
+PROBE_NAME = ".UntilThen.pck.probe"
+PROBE_BYTES = 16 * 1024 * 1024
+# Installs that write less than this take about as long as timing them
+# would, so they are not estimated.
+MIN_PROBE_BYTES = 1024 * 1024
+
+_PROBE_CHUNK_SIZE = 1024 * 1024
+
+
+class InsufficientSpaceError(OSError):
+    pass
+
+
+@dataclass(frozen=True)
+class SpaceNeed:
+    path: Path  # a folder on the filesystem
+    needed: int
+    free: int
+
+    @property
+    def enough(self) -> bool:
+        return self.needed <= self.free
+
+
+@dataclass(frozen=True)
+class Preflight:
+    mode: str  # "append", "rebuild", "packer" or "up_to_date"
+    needs: list[SpaceNeed] = field(default_factory=list)
+    write_bytes: int = 0
+    throughput: Optional[float] = None  # bytes per second, to the target
+
+    @property
+    def eta(self) -> Optional[float]:
+        """
+        Seconds the install should take to write its files, if known.
+        """
+        if not self.throughput:
+            return None
+        return self.write_bytes / self.throughput
+
+    def summary(self) -> list[str]:
+        """
+        One line per filesystem the install writes to, then the estimate.
+        """
+        lines = [
+            f"Espaço necessário em {need.path}:"
+            f" {format_file_size(need.needed)}"
+            f" ({format_file_size(need.free)} livres)"
+            for need in self.needs
+        ]
+        if self.eta is not None:
+            lines.append(
+                f"Tempo estimado de gravação: {format_duration(self.eta)}"
+            )
+        return lines
+
+    def check(self) -> None:
+        for need in self.needs:
+            if not need.enough:
+                raise InsufficientSpaceError(
+                    f"Espaço insuficiente em {need.path}: são necessários"
+                    f" {format_file_size(need.needed)}, mas há apenas"
+                    f" {format_file_size(need.free)} livres"
+                )
+
+
+def _existing_folder(path: Path) -> Path:
+    path = path.absolute()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return path
+
+
+def space_needs(needs: list[tuple[Path, int]]) -> list[SpaceNeed]:
+    """
+    Adds the (folder, bytes) needs up per filesystem and pairs each sum
+    with the space that filesystem has free.
+    """
+    by_device: dict[int, tuple[Path, int]] = {}
+    for path, needed in needs:
+        folder = _existing_folder(path)
+        device = folder.stat().st_dev
+        first, total = by_device.get(device, (folder, 0))
+        by_device[device] = (first, total + needed)
+
+    return [
+        SpaceNeed(folder, needed, shutil.disk_usage(folder).free)
+        for folder, needed in by_device.values()
+    ]
+
+
+def measure_throughput(
+        folder: Path,
+        size: int = PROBE_BYTES,
+) -> Optional[float]:
+    """
+    Bytes per second a synced write of `size` bytes to `folder` takes, or
+    None when the probe file cannot be written. The data is random so
+    that compressing filesystems do not flatter the result.
+    """
+    probe = folder / PROBE_NAME
+    chunk = os.urandom(_PROBE_CHUNK_SIZE)
+    count = max(1, size // len(chunk))
+    start = time.perf_counter()
+    try:
+        with open(probe, "wb") as file:
+            for _ in range(count):
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        seconds = time.perf_counter() - start
+    except OSError:
+        return None
+    finally:
+        probe.unlink(missing_ok=True)
+    return count * len(chunk) / max(seconds, 1e-6)
+
+
+def plan_install(
+        target: Path,
+        zf: zipfile.ZipFile,
+        folder: str,
+        backup: bool,
+        temp_dir: Path,
+        packer: bool = False,
+) -> tuple[str, list[tuple[Path, int]], int]:
+    """
+    The mode the install will take and the (folder, bytes) it needs, as
+    well as the bytes it will write. Appending needs room for the changed
+    files, rebuilding for a whole new PCK and the external packer, also
+    chosen with `packer`, for the extracted archive as well. A backup is
+    counted as the entries it replaces, which is what a delta keeps; a
+    reflink, hardlink or rename is free.
+    """
+    patches = list(zip_entries(zf, folder))
+    target_size = target.stat().st_size
+    try:
+        with open(target, "rb") as file:
+            index = read_index(file)
+    except PCKFormatError:
+        index = None
+
+    if index is None or packer:
+        extracted = sum(info.file_size for info in zf.infolist())
+        output = target_size + sum(patch.size for patch in patches)
+        return "packer", [
+            (target.parent, output),
+            (temp_dir, extracted),
+        ], output + extracted
+
+    changed = changed_entries(index, patches, read_manifest(zf, folder))
+    if not changed:
+        return "up_to_date", [], 0
+
+    entry_map = index.entry_map()
+    replaced = 0
+    new_entries = []
+    for patch in changed:
+        entry = entry_map.get(normalize_path(patch.path))
+        if entry is not None:
+            replaced += entry.size
+        else:
+            new_entries.append(PCKEntry(index.pck_path(patch.path), 0, 0))
+    added = sum(patch.size + PCK_PADDING for patch in changed)
+    backup_bytes = replaced if backup else 0
+
+    if fits_in_place(index, changed):
+        write = added + backup_bytes
+        return "append", [(target.parent, write)], write
+
+    table_growth = (directory_size(index.entries + new_entries)
+                    - directory_size(index.entries))
+    output = target_size - replaced + added + table_growth
+    write = output + backup_bytes
+    return "rebuild", [(target.parent, write)], write
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+from src.engine.extract import ArchiveOpener, extract_archives
+from src.progress import ProgressAggregator
+from src.utils import user_cache_dir
+
+CACHE_NAME = "toolchains"
+MANIFEST_NAME = ".toolchain.json"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+# A staging folder this old was left by an extraction that died; one
+# being written is far younger.
+STALE_PARTIAL_SECONDS = 60 * 60
+
+_HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _sha256(stream) -> str:
+    digest = hashlib.sha256()
+    while chunk := stream.read(_HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _timestamps(info: os.stat_result) -> list[int]:
+    return [info.st_mtime_ns, info.st_ctime_ns]
+
+
+def bundle_hash(open_archive: ArchiveOpener) -> str:
+    """
+    Identifies a bundle by the name, size and CRC-32 of each member. Those
+    are all in the zip's central directory, so only a few KB are read
+    rather than the whole bundle.
+    """
+    digest = hashlib.sha256()
+    with open_archive() as reader, zipfile.ZipFile(reader) as zf:
+        for info in zf.infolist():
+            digest.update(
+                f"{info.filename}\0{info.file_size}\0{info.CRC}\n".encode()
+            )
+    return digest.hexdigest()
+
+
+class ToolchainCache:
+    """
+    Extracted copies of the external packer bundle, one folder per bundle
+    hash and installer version under `root`, by default in the user cache
+    directory. Each folder carries a manifest of the files it holds and
+    their SHA-256, taken from the bundle and written last. Every file is
+    checked against it before the copy is used, since the packer is run
+    from a folder any program of the user can write to. Files whose size
+    and timestamps are still the ones recorded are not hashed again. The
+    least recently used copies are removed once the cache grows past
+    `max_bytes`.
+    """
+
+    def __init__(
+            self,
+            setup_version: str,
+            root: Optional[Path] = None,
+            max_bytes: int = MAX_CACHE_BYTES,
+    ):
+        self.root = root if root is not None else user_cache_dir() / CACHE_NAME
+        self.setup_version = setup_version
+        self.max_bytes = max_bytes
+
+    def key(self, digest: str) -> str:
+        return f"{self.setup_version or 'dev'}-{digest[:16]}"
+
+    def lookup(self, digest: str) -> Optional[Path]:
+        """
+        The folder holding the bundle with this hash, when a verified copy
+        of it is cached.
+        """
+        folder = self.root / self.key(digest)
+        manifest = self._read_manifest(folder)
+        if (manifest is None
+                or manifest.get("bundle_digest") != digest
+                or manifest.get("setup_version") != self.setup_version
+                or not self._verify(folder, manifest)):
+            return None
+
+        try:
+            # The manifest's mtime is the last use, for eviction.
+            os.utime(folder / MANIFEST_NAME)
+        except OSError:
+            pass
+        return folder
+
+    def fetch(
+            self,
+            open_archive: ArchiveOpener,
+            progress: ProgressAggregator,
+            max_workers: Optional[int] = None,
+    ) -> Path:
+        """
+        The folder holding the extracted bundle, extracting it first when
+        there is no verified copy yet.
+        """
+        digest = bundle_hash(open_archive)
+        folder = self.lookup(digest)
+        if folder is not None:
+            return folder
+
+        staging = self.stage(digest)
+        try:
+            extract_archives([(open_archive, staging)], progress, max_workers)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return self.publish(staging, open_archive, digest)
+
+    def stage(self, digest: str) -> Path:
+        """
+        A new, empty folder to extract the bundle with this hash into,
+        for `publish()` to move into the cache afterwards.
+        """
+        staging = self.root / f"{self.key(digest)}.{os.getpid()}.partial"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        return staging
+
+    def publish(
+            self,
+            staging: Path,
+            open_archive: ArchiveOpener,
+            digest: str,
+    ) -> Path:
+        """
+        Checks the bundle extracted into `staging` and moves it into the
+        cache, whose folder for it is returned. `staging` is removed
+        either way.
+        """
+        folder = self.root / self.key(digest)
+        try:
+            manifest = self._write_manifest(staging, open_archive, digest)
+            if not self._verify(staging, manifest, rehash=True):
+                raise OSError(
+                    "Os arquivos extraídos do empacotador não conferem"
+                )
+            shutil.rmtree(folder, ignore_errors=True)
+            os.replace(staging, folder)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.evict(keep=folder)
+        return folder
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """
+        Removes unusable folders, then the least recently used copies
+        until the cache fits in `max_bytes`. `keep` is never removed.
+        """
+        entries = []
+        for folder in self.root.iterdir():
+            if not folder.is_dir() or folder == keep:
+                continue
+            manifest = self._read_manifest(folder)
+            if manifest is None:
+                # Left behind by an extraction that never finished, unless
+                # another installer is still writing it.
+                if self._is_stale(folder):
+                    shutil.rmtree(folder, ignore_errors=True)
+                continue
+            last_used = (folder / MANIFEST_NAME).stat().st_mtime
+            entries.append((last_used, folder, manifest.get("size", 0)))
+
+        total = sum(size for _, _, size in entries)
+        if keep is not None:
+            manifest = self._read_manifest(keep)
+            total += manifest.get("size", 0) if manifest else 0
+
+        for _, folder, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
+
+    @staticmethod
+    def _read_manifest(folder: Path) -> Optional[dict]:
+        try:
+            with open(folder / MANIFEST_NAME, encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return manifest if isinstance(manifest, dict) else None
+
+    @staticmethod
+    def _is_stale(folder: Path) -> bool:
+        if folder.name.endswith(f".{os.getpid()}.partial"):
+            return False
+        try:
+            age = time.time() - folder.stat().st_mtime
+        except OSError:
+            return False
+        return age > STALE_PARTIAL_SECONDS
+
+    @staticmethod
+    def _verify(folder: Path, manifest: dict, rehash: bool = False) -> bool:
+        files = manifest.get("files")
+        if not isinstance(files, dict):
+            return False
+        for name, expected in files.items():
+            if not isinstance(expected, dict):
+                return False
+            try:
+                path = folder / name
+                info = path.stat()
+                if info.st_size != expected.get("size"):
+                    return False
+                # Hashing the whole toolchain on every run would cost about
+                # as much as extracting it again. Writing to a file, or
+                # setting its mtime back, gives it a new ctime.
+                if (not rehash
+                        and _timestamps(info) == expected.get("timestamps")):
+                    continue
+                with open(path, "rb") as file:
+                    if _sha256(file) != expected.get("sha256"):
+                        return False
+            except OSError:
+                return False
+        return True
+
+    def _write_manifest(
+            self,
+            folder: Path,
+            open_archive: ArchiveOpener,
+            digest: str,
+    ) -> dict:
+        # The hashes come from the bundle itself, so a file damaged while
+        # it was extracted is caught too.
+        files = {}
+        with open_archive() as reader, zipfile.ZipFile(reader) as zf:
+            for info in zf.infolist():
+                # Named as `extract_archives` names them; a "lib\\" entry
+                # is a folder too, although ZipInfo.is_dir() misses it.
+                name = info.filename.replace("\\", "/")
+                if name.endswith("/"):
+                    continue
+                with zf.open(info) as member:
+                    files[name] = {
+                        "size": info.file_size,
+                        "sha256": _sha256(member),
+                    }
+        for name, file in files.items():
+            try:
+                file["timestamps"] = _timestamps((folder / name).stat())
+            except OSError:
+                # Left for the check that follows to reject.
+                pass
+
+        manifest = {
+            "setup_version": self.setup_version,
+            "bundle_digest": digest,
+            "size": sum(file["size"] for file in files.values()),
+            "files": files,
+        }
+        (folder / MANIFEST_NAME).write_text(
+            json.dumps(manifest, indent=2), encoding="utf-8"
+        )
+        return manifest
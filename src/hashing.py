@@ -0,0 +1,85 @@
+import hashlib
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+# A file is hashed as fixed-size chunks whose SHA-256 digests are hashed
+# again together with the file size. Chunks are independent, so large
+# files can be hashed by several threads at once.
+HASH_SCHEME = "sha256-tree-64m"
+TREE_CHUNK_SIZE = 64 * 1024 * 1024
+READ_SIZE = 4 * 1024 * 1024
+
+
+def _combine(digests: list[bytes], size: int) -> str:
+    root = hashlib.sha256(struct.pack("<Q", size))
+    for digest in digests:
+        root.update(digest)
+    return root.hexdigest()
+
+
+class TreeHasher:
+    """
+    Incremental version of `tree_hash_file`, for data that is being
+    written sequentially anyway.
+    """
+
+    def __init__(self):
+        self._digests: list[bytes] = []
+        self._chunk = hashlib.sha256()
+        self._chunk_size = 0
+        self._size = 0
+
+    def update(self, data) -> None:
+        view = memoryview(data).cast("B")
+        while view.nbytes:
+            take = min(view.nbytes, TREE_CHUNK_SIZE - self._chunk_size)
+            self._chunk.update(view[:take])
+            self._chunk_size += take
+            self._size += take
+            view = view[take:]
+            if self._chunk_size == TREE_CHUNK_SIZE:
+                self._digests.append(self._chunk.digest())
+                self._chunk = hashlib.sha256()
+                self._chunk_size = 0
+
+    def hexdigest(self) -> str:
+        digests = list(self._digests)
+        if self._chunk_size:
+            digests.append(self._chunk.digest())
+        return _combine(digests, self._size)
+
+
+def _hash_chunk(path: Path, offset: int, size: int) -> bytes:
+    sha256 = hashlib.sha256()
+    buffer = bytearray(READ_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as file:
+        file.seek(offset)
+        while size:
+            read = file.readinto(view[:min(size, READ_SIZE)])
+            if not read:
+                raise EOFError(f"Fim de arquivo inesperado em {path}")
+            sha256.update(view[:read])
+            size -= read
+    return sha256.digest()
+
+
+def tree_hash_file(path: Path, workers: Optional[int] = None) -> str:
+    """
+    Hashes `path` with HASH_SCHEME, one chunk per thread.
+    """
+    size = path.stat().st_size
+    offsets = range(0, size, TREE_CHUNK_SIZE)
+    workers = workers or min(8, os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(workers) as pool:
+        digests = list(pool.map(
+            lambda offset: _hash_chunk(
+                path, offset, min(TREE_CHUNK_SIZE, size - offset)
+            ),
+            offsets,
+        ))
+    return _combine(digests, size)
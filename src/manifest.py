@@ -0,0 +1,100 @@
+import hashlib
+import json
+import zipfile
+from typing import NamedTuple, Optional
+
+from src.pck import PCKIndex, PatchEntry, normalize_path
+
+MANIFEST_NAME = "manifest.json"
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    md5: str
+
+
+def _md5_of(stream) -> str:
+    md5 = hashlib.md5()
+    while chunk := stream.read(1024 * 1024):
+        md5.update(chunk)
+    return md5.hexdigest()
+
+
+def build_manifest(zf: zipfile.ZipFile, version: str) -> dict:
+    """
+    Describes every file of the translation archive by size and MD5 (the
+    same hash the PCK file table stores), grouped by top-level folder.
+    """
+    folders: dict[str, dict[str, dict]] = {}
+    for info in zf.infolist():
+        name = info.filename.replace("\\", "/")
+        if name.endswith("/") or "/" not in name:
+            continue
+        folder, path = name.split("/", 1)
+        with zf.open(info) as stream:
+            md5 = _md5_of(stream)
+        folders.setdefault(folder, {})[normalize_path(path)] = {
+            "size": info.file_size,
+            "md5": md5,
+        }
+
+    return {"version": version, "folders": folders}
+
+
+def read_manifest(
+        zf: zipfile.ZipFile,
+        folder: str,
+) -> Optional[dict[str, ManifestEntry]]:
+    """
+    Returns the manifest entries of `folder`, or None when the archive was
+    built without a manifest.
+    """
+    try:
+        data = json.loads(zf.read(MANIFEST_NAME))
+    except KeyError:
+        return None
+
+    files = data.get("folders", {}).get(folder, {})
+    return {
+        path: ManifestEntry(entry["size"], entry["md5"])
+        for path, entry in files.items()
+    }
+
+
+def read_manifest_version(zf: zipfile.ZipFile) -> Optional[str]:
+    try:
+        return json.loads(zf.read(MANIFEST_NAME)).get("version")
+    except KeyError:
+        return None
+
+
+def changed_entries(
+        index: PCKIndex,
+        patches: list[PatchEntry],
+        manifest: Optional[dict[str, ManifestEntry]],
+) -> list[PatchEntry]:
+    """
+    Filters `patches` down to the ones whose content differs from what the
+    PCK file table already holds. Without a manifest, files are hashed on
+    the fly, but only when their size matches.
+    """
+    entries = index.entry_map()
+    changed = []
+    for patch in patches:
+        path = normalize_path(patch.path)
+        entry = entries.get(path)
+        if entry is None or entry.size != patch.size:
+            changed.append(patch)
+            continue
+
+        expected = manifest.get(path) if manifest is not None else None
+        if expected is not None and expected.size == patch.size:
+            md5 = expected.md5
+        else:
+            with patch.open() as stream:
+                md5 = _md5_of(stream)
+
+        if bytes.fromhex(md5) != entry.md5:
+            changed.append(patch)
+
+    return changed
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from PySide6.QtCore import Qt, QSize, Signal
 from PySide6.QtGui import QMovie
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QSizePolicy, \
@@ -36,13 +38,11 @@ class FinalPage(QWidget):
             "</center>"
         )
 
-        gif_movie = QMovie(":cathy")
-        gif_movie.start()
-        gif_movie.setScaledSize(QSize(100, 100))
-
-        gif_label = QLabel()
-        gif_label.setMovie(gif_movie)
-        gif_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # The GIF is decoded and played only while the page is visible.
+        self.gif_movie: Optional[QMovie] = None
+        self.gif_label = QLabel()
+        self.gif_label.setFixedHeight(100)
+        self.gif_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         self.close_button = QPushButton(self.tr("Até Lá!"))
         self.close_button.setMinimumHeight(50)
@@ -55,10 +55,25 @@ class FinalPage(QWidget):
         )
 
         layout.addStretch()
-        layout.addWidget(gif_label)
+        layout.addWidget(self.gif_label)
         layout.addWidget(message)
         layout.addWidget(self.close_button)
         layout.addStretch()
 
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+
+        if self.gif_movie is None:
+            self.gif_movie = QMovie(":cathy", parent=self)
+            self.gif_movie.setScaledSize(QSize(100, 100))
+            self.gif_label.setMovie(self.gif_movie)
+        self.gif_movie.start()
+
+    def hideEvent(self, event) -> None:
+        super().hideEvent(event)
+
+        if self.gif_movie is not None:
+            self.gif_movie.stop()
+
     def _on_close(self):
         self.quit.emit()
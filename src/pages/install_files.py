@@ -1,29 +1,39 @@
-import io
-import platform
-import shutil
-import stat
-import zipfile
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
-from PySide6.QtCore import Signal, QObject, QThread, QFile, QTemporaryDir, \
-    Qt, QProcess, QTimer
+from PySide6.QtCore import Signal, QObject, QThread, QTemporaryDir, Qt
 from PySide6.QtWidgets import QWidget, QTextEdit, QVBoxLayout, QProgressBar, \
     QLabel
 
+from src.assets import TRANSLATION_FILES, open_payload, \
+    pck_explorer_payload
+from src.engine import ExtractProgress, InstallEvent, Installer, \
+    PackerError, PackerProgress, PatchProgress, PatchResult, StageStarted, \
+    ToolchainCache, event_message
+from src.pck import PCKFormatError
+from src.utils import format_duration
+
+# QProgressBar only holds 32-bit values, so byte progress is scaled down.
+_PROGRESS_SCALE = 1000
+
 
 class InstallFilesPage(QWidget):
     finished = Signal()
+    # Emitted from the installer's worker thread, delivered on the GUI one.
+    _installer_event = Signal(object)
 
-    def __init__(self):
+    def __init__(self, setup_version: str = ""):
         super().__init__()
+        self._setup_version = setup_version
         self._target_path: Optional[Path] = None
         self._is_demo: Optional[bool] = None
         self._make_backup: bool = True
-        self._total_files = 0
+        self._throughput: Optional[float] = None
+        self._installer: Optional[Installer] = None
         self.temp_dir = QTemporaryDir()
         self._process_started = False
-        self._last_logs = []
+        self._installer_event.connect(self._on_installer_event)
         self._ui()
 
     def showEvent(self, event) -> None:
@@ -31,7 +41,7 @@ class InstallFilesPage(QWidget):
         
         if not self._process_started:
             self._process_started = True
-            self._unzip_translation_files()
+            self._install_files()
 
     def _ui(self):
         layout = QVBoxLayout(self)
@@ -55,145 +65,225 @@ class InstallFilesPage(QWidget):
         layout.addWidget(self.log_widget)
         layout.addStretch()
 
-    def _unzip_translation_files(self):
-        temp_dir_path = Path(self.temp_dir.path())
-        translation_files_resource = ":translation_files"
+    def _install_files(self):
+        self.status_label.setText(self.tr("Instalando arquivos de tradução..."))
+        self.progress_bar.setRange(0, _PROGRESS_SCALE)
+        self.progress_bar.setValue(0)
 
-        self._unzip(
-            translation_files_resource,
-            temp_dir_path,
-            "translation_files",
-            on_finished=self._unzip_pck_explorer,
+        self._installer = Installer(
+            self._target_path,
+            partial(open_payload, TRANSLATION_FILES),
+            demo=bool(self._is_demo),
+            make_backup=self._make_backup,
+            on_event=self._installer_event.emit,
+            throughput=self._throughput,
         )
 
-    def _unzip_pck_explorer(self):
-        system = platform.system()
-        temp_dir_path = Path(self.temp_dir.path())
-        pck_explorer_bin: str
+        def install():
+            self._installer.prepare()
+            self._installer.preflight(Path(self.temp_dir.path()))
+            return self._installer.install()
+
+        self._run_step(install, self._on_install_finished, self._on_patch_error)
+
+    def _run_step(self, step, on_finished, on_error):
+        """
+        Runs one blocking installer step on a worker thread. Its events
+        arrive through `_installer_event` in the meantime.
+        """
+        step_thread = QThread(self)
+        step_worker = _StepWorker()
+
+        step_worker.moveToThread(step_thread)
+        # Without a direct connection the lambda would run in the thread
+        # that owns step_thread, which is the GUI one.
+        step_thread.started.connect(
+            lambda: step_worker.run(step),
+            Qt.ConnectionType.DirectConnection,
+        )
 
-        if system == "Windows":
-            pck_explorer_bin = ":win_pck_explorer"
+        step_worker.finished.connect(on_finished)
+        step_worker.error.connect(on_error)
+
+        step_worker.finished.connect(step_thread.quit)
+        step_worker.error.connect(step_thread.quit)
+        step_thread.finished.connect(step_worker.deleteLater)
+        step_thread.finished.connect(step_thread.deleteLater)
+
+        step_thread.start()
+
+    def _on_installer_event(self, event: InstallEvent):
+        if isinstance(event, PatchProgress):
+            self._on_patch_progress(event)
+        elif isinstance(event, ExtractProgress):
+            self._on_extract_progress(event)
+        elif isinstance(event, PackerProgress):
+            self._on_packer_progress(event)
+        elif isinstance(event, StageStarted):
+            self._on_stage_started(event)
         else:
-            pck_explorer_bin = ":linux_pck_explorer"
-
-        self._clear_feedback()
-        self._unzip(
-            pck_explorer_bin,
-            temp_dir_path,
-            "pck_explorer",
-            on_finished=self._install_files,
+            message = event_message(event)
+            if message is not None:
+                self.log_widget.append_message(message)
+
+    def _on_stage_started(self, event: StageStarted):
+        if event.stage == "preflight":
+            self.status_label.setText(self.tr("Verificando espaço em disco..."))
+            self.progress_bar.setRange(0, 0)
+        elif event.stage == "packer":
+            self.status_label.setText(self.tr("Instalando arquivos de tradução..."))
+            self.progress_bar.setRange(0, 0)
+        elif event.stage == "commit":
+            self.status_label.setText(self.tr("Finalizando a instalação..."))
+        elif event.stage == "verify":
+            self.status_label.setText(self.tr("Verificando o backup..."))
+            self.progress_bar.setRange(0, 0)
+
+    def _on_patch_progress(self, event: PatchProgress):
+        done, total = event.done, event.total
+        percent = done * 100 // total if total else 0
+        self.progress_bar.setRange(0, _PROGRESS_SCALE)
+        self.status_label.setText(
+            self.tr("Instalando arquivos de tradução... ") + f"{percent}%"
+        )
+        self.progress_bar.setValue(
+            done * _PROGRESS_SCALE // total if total else 0
         )
 
-    def _install_files(self):
-        self.status_label.setText(self.tr("Instalando arquivos de tradução..."))
-        self.progress_bar.setRange(0, 0)
-        
-        modified_pck = self._target_path.parent / "ModifiedPCK.pck"
-        if modified_pck.exists():
-            try:
-                modified_pck.unlink()
-            except Exception:
-                pass
-
-        system = platform.system()
-        temp_dir_path = Path(self.temp_dir.path())
-        base_files_path = temp_dir_path / "translation_files"
-        files_path: Path
-        pck_explorer_bin = temp_dir_path / "pck_explorer"
-
-        if self._is_demo:
-            files_path = base_files_path / "demo"
-        else:
-            files_path = base_files_path / "full"
+    def _on_extract_progress(self, event: ExtractProgress):
+        self.progress_bar.setRange(0, _PROGRESS_SCALE)
+        self.status_label.setText(
+            self.tr("Extraindo ")
+            + str(event.files_done)
+            + self.tr(" de ")
+            + str(event.files_total)
+            + f" ({event.bytes_done / 1048576:.1f}"
+            + f" / {event.bytes_total / 1048576:.1f} MB)"
+        )
+        self.progress_bar.setValue(
+            event.bytes_done * _PROGRESS_SCALE // event.bytes_total
+            if event.bytes_total else _PROGRESS_SCALE
+        )
+        self.log_widget.append_messages(event.names)
 
-        if system == "Windows":
-            pck_explorer_bin = (pck_explorer_bin
-                                / "GodotPCKExplorer.Console.exe")
+    def _on_install_finished(self, result: PatchResult):
+        self.progress_bar.setRange(0, _PROGRESS_SCALE)
+        self.progress_bar.setValue(_PROGRESS_SCALE)
+        self._installer.report.finish(
+            "up_to_date" if result.up_to_date else "success"
+        )
+        if result.up_to_date:
+            self.log_widget.append_message(
+                "Sucesso: A tradução já estava instalada. Nada foi alterado."
+            )
         else:
-            pck_explorer_bin = pck_explorer_bin / "GodotPCKExplorer.Console"
-            mode = pck_explorer_bin.stat().st_mode
-            if not (mode & stat.S_IXUSR):
-                pck_explorer_bin.chmod(mode | stat.S_IXUSR)
-
-        self.process = QProcess()
-           
-        self.process.readyReadStandardOutput.connect(self._read_process_output)
-        self.process.errorOccurred.connect(self._on_process_error)
-
-        self.process.finished.connect(self._on_install_finished)
-        
-        self.process.setProcessChannelMode(
-            QProcess.ProcessChannelMode.MergedChannels
+            self.log_widget.append_message(
+                "Sucesso: Tradução aplicada com sucesso."
+            )
+        self.finished.emit()
+
+    def _on_patch_error(self, error: Exception):
+        self._installer.rollback()
+
+        if isinstance(error, PCKFormatError):
+            # Layouts the native patcher does not understand are still
+            # handled by GodotPCKExplorer, which needs the files on disk.
+            self._unzip_fallback_files()
+            self.log_widget.append_message(
+                f"Aviso: {error}. Usando o empacotador externo."
+            )
+            return
+
+        self.log_widget.append_message(
+            f"Erro: Falha ao aplicar a tradução ({error})"
         )
-
-        self.process.setWorkingDirectory(str(pck_explorer_bin.parent.absolute().resolve()))
-
-        self.process.start(
-            str(pck_explorer_bin.absolute().resolve()),
-            [
-                "-pc",
-                str(self._target_path.absolute().resolve()),
-                str(files_path.absolute().resolve()),
-                str(Path(self._target_path.parent / "ModifiedPCK.pck")
-                    .absolute().resolve()),
-                "2.2.4.1"
-            ]
+        self._report_failure(error)
+
+    def _report_failure(self, error):
+        """
+        Saves the install report and sums its stages up in the log, so a
+        failed install can be diagnosed from a screenshot or the file.
+        """
+        report = self._installer.report
+        report.finish("error", error)
+
+        self.log_widget.append_message("Etapas da instalação:")
+        self.log_widget.append_messages(
+            [f"> {line}" for line in report.summary()]
+        )
+        if report.path is not None and report.path.exists():
+            self.log_widget.append_message(
+                f"Relatório salvo em {report.path}"
+            )
+        if report.packer_log_path is not None:
+            self.log_widget.append_message(
+                f"Log do empacotador salvo em {report.packer_log_path}"
+            )
+
+    def _unzip_fallback_files(self):
+        self._clear_feedback()
+        # The packer is kept extracted between runs, so only the first
+        # fallback install, or one after an update, pays for unzipping it.
+        toolchain = ToolchainCache(self._setup_version)
+
+        def unzip():
+            # The packer needs room the native install did not plan for.
+            self._installer.preflight(Path(self.temp_dir.path()), packer=True)
+            # On a cache miss both archives are extracted at the same time.
+            return self._installer.extract_for_packer(
+                Path(self.temp_dir.path()),
+                partial(open_payload, pck_explorer_payload()),
+                toolchain,
+            )
+
+        self._run_step(unzip, self._run_pck_explorer, self._on_unzip_error)
+
+    def _run_pck_explorer(self, unzipped: tuple[Path, Path]):
+        pck_explorer_dir, files_path = unzipped
+        self._run_step(
+            partial(self._installer.run_packer, pck_explorer_dir, files_path),
+            self._on_packer_committed,
+            self._on_packer_error,
         )
 
-    def _read_process_output(self):
-        system = platform.system()
-        
-        while self.process.canReadLine():
-            byte_array = self.process.readLine()
-            text = byte_array.data().decode(errors="replace").strip()
-
-            if text:
-                self._last_logs.append(text)
-                if len(self._last_logs) > 5:
-                    self._last_logs.pop(0)
-                    
-                if "Error" in text or "Exception" in text or "Fail" in text:
-                    self.log_widget.append_message(text)
-
-    def _on_process_error(self, error):
-        self.log_widget.append_message(f"Erro: Falha ao tentar abrir o empacotador ({error})")
-
-    def _on_install_finished(self, exit_code, exit_status):
-        src = Path(self._target_path)
-        modified = Path(src.parent) / "ModifiedPCK.pck"
-        backup_path = Path(src.parent) / "UntilThen.pck.backup"
+    def _on_packer_progress(self, event: PackerProgress):
+        details = []
+        if event.rate:
+            details.append(f"{event.rate / 1048576:.1f} MB/s")
+        if event.eta is not None:
+            details.append(
+                f"~{format_duration(event.eta)}" + self.tr(" restantes")
+            )
 
-        try:
-            if modified.exists():
-                if self._make_backup:
-                    if not backup_path.exists():
-                        src.replace(backup_path)
-                        self.log_widget.append_message("Sucesso: O arquivo de backup foi criado.")
-                    else:
-                        if src.exists():
-                            src.unlink()
-                        self.log_widget.append_message("Aviso: O backup já existia. Nada foi alterado.")
-                else:
-                    if src.exists():
-                        src.unlink()
-                
-                modified.replace(src)
-                self.log_widget.append_message("Sucesso: Tradução aplicada com sucesso.")
-                self.finished.emit()
-            else:
-                self.log_widget.append_message(f"Erro: O arquivo de tradução não foi gerado pelo empacotador.\nCódigo: {exit_code}")
-                for msg in self._last_logs:
-                    self.log_widget.append_message(f"> {msg}")
-
-        except PermissionError:
+        self.status_label.setText(
+            self.tr("Instalando arquivos de tradução... ")
+            + f"{event.fraction * 100:.0f}%"
+            + (f" ({', '.join(details)})" if details else "")
+        )
+        self.progress_bar.setRange(0, _PROGRESS_SCALE)
+        self.progress_bar.setValue(int(event.fraction * _PROGRESS_SCALE))
+
+    def _on_packer_committed(self, _result):
+        self._installer.report.finish("success")
+        self.log_widget.append_message("Sucesso: Tradução aplicada com sucesso.")
+        self.finished.emit()
+
+    def _on_packer_error(self, error: Exception):
+        # The installer has already rolled the install back.
+        if isinstance(error, PackerError):
+            self.log_widget.append_message(f"Erro: {error}")
+            self.log_widget.append_messages(
+                [f"> {line}" for line in self._installer.packer_log.tail]
+            )
+        elif isinstance(error, PermissionError):
             self.log_widget.append_message("Erro: Permissão negada ao mover/renomear os arquivos")
-        except OSError as e:
-            self.log_widget.append_message(f"Erro de sistema ao finalizar: {e.strerror}")
-        except Exception as e:
-            self.log_widget.append_message(f"Ocorreu um erro inesperado: {str(e)}")
+        elif isinstance(error, OSError):
+            self.log_widget.append_message(f"Erro de sistema ao finalizar: {error.strerror}")
+        else:
+            self.log_widget.append_message(f"Ocorreu um erro inesperado: {str(error)}")
+        self._report_failure(error)
 
     def _clear_feedback(self):
-        self._total_files = 0
         self.progress_bar.setValue(0)
         self.progress_bar.setRange(0, 0)
         self.status_label.setText(self.tr("Extração completa!"))
@@ -208,86 +298,27 @@ class InstallFilesPage(QWidget):
     def set_make_backup(self, make_backup: bool):
         self._make_backup = make_backup
 
-    def _on_total_files(self, total_files: int):
-        self.progress_bar.setRange(0, total_files)
-        self._total_files = total_files
+    def set_throughput(self, throughput: Optional[float]):
+        # Measured while the target was picked, so the disk is not timed
+        # twice.
+        self._throughput = throughput
 
-    def _on_progress(self, count: int, name: str):
-        self.status_label.setText(
-            self.tr("Extraindo ")
-            + str(count)
-            + self.tr(" de ")
-            + str(self._total_files)
-        )
-        self.progress_bar.setValue(count)
-        self.log_widget.append_message(name)
-
-    def _unzip(
-            self,
-            resource: str,
-            destination: Path,
-            folder_name: str,
-            on_finished,
-    ):
-        file = QFile(resource)
-        if not file.open(QFile.OpenModeFlag.ReadOnly):
-            raise Exception(f"Falha ao abrir {resource}")
-
-        data = bytes(file.readAll().data())
-        file.close()
-
-        unzip_thread = QThread(self)
-        unzip_worker = _UnzipWorker()
-
-        unzip_worker.moveToThread(unzip_thread)
-        unzip_thread.started.connect(
-            lambda: unzip_worker.run(data, destination, folder_name)
+    def _on_unzip_error(self, error: Exception):
+        self.log_widget.append_message(
+            f"Erro: Falha ao extrair os arquivos ({error})"
         )
-
-        unzip_worker.total_files.connect(self._on_total_files)
-        unzip_worker.progress.connect(self._on_progress)
-        if on_finished:
-            unzip_worker.finished.connect(on_finished)
-
-        unzip_worker.finished.connect(unzip_thread.quit)
-        unzip_worker.finished.connect(unzip_worker.deleteLater)
-        unzip_thread.finished.connect(unzip_thread.deleteLater)
-
-        unzip_thread.start()
+        self._report_failure(error)
 
 
-class _UnzipWorker(QObject):
-    finished = Signal()
+class _StepWorker(QObject):
+    finished = Signal(object)
     error = Signal(Exception)
-    total_files = Signal(int)
-    progress = Signal(int, str)
-
-    def run(self, data: bytes, destination: Path, folder_name: str):
-        self._unzip(data, destination, folder_name)
-
-    def _unzip(self, data: bytes, destination: Path, folder_name: str):
-        dest_dir = Path(destination) / folder_name
-        dest_dir.mkdir(parents=True, exist_ok=True)
-
-        buffer = io.BytesIO(data)
-        buffer.seek(0)
 
+    def run(self, step):
         try:
-            with zipfile.ZipFile(buffer) as zf:
-                infos = zf.infolist()
-                self.total_files.emit(len(infos))
-
-                count = 0
-                for info in infos:
-                    info.filename = info.filename.replace('\\', '/')
-                    zf.extract(info, str(dest_dir.resolve()))
-                    count += 1
-                    self.progress.emit(count, info.filename)
-
-            self.finished.emit()
+            self.finished.emit(step())
         except Exception as e:
             self.error.emit(e)
-            return None
 
 
 class _LogWidget(QTextEdit):
@@ -311,3 +342,9 @@ class _LogWidget(QTextEdit):
 
         scrollbar = self.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
+
+    def append_messages(self, messages: list[str]):
+        # Lines beyond the block limit would be dropped right away anyway.
+        messages = messages[-self.document().maximumBlockCount():]
+        if messages:
+            self.append_message("\n".join(messages))
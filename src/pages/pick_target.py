@@ -1,28 +1,54 @@
-import os
-import platform
+import tempfile
+import threading
+from functools import cached_property, partial
 from pathlib import Path
+from typing import Optional
 
 import qtawesome
-import vdf
-from PySide6.QtCore import Signal, Qt, QDir
+from PySide6.QtCore import Signal, Qt, QDir, QObject, QThread
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QGroupBox, \
     QSizePolicy, QHBoxLayout, QPushButton, QFrame, QFileDialog, QMessageBox, \
     QCheckBox
 
+from src.assets import TRANSLATION_FILES, open_payload
+from src.backup import has_backup, restore_original
+from src.engine import InstallJournal, InstallRecovered, Installer, \
+    Preflight, event_message, recover_install
+from src.pck import PCKFormatError, PCKProbe, probe_pck
+from src.steam import SteamLibraryIndex, find_steam_path, probe_paths
+from src.utils import format_file_size
+
+PCK_NAME = "UntilThen.pck"
+
 
 class PickTargetPage(QWidget):
     FULL_GAME_ID = 1574820  # full game steam id
     DEMO_GAME_ID = 2296400  # demo steam id
 
-    finished = Signal(Path, bool, bool)  # target_path, is_demo, make_backup
+    # target_path, is_demo, make_backup, disk throughput or None
+    finished = Signal(Path, bool, bool, object)
     clicked_back = Signal()
+    # Emitted from the search thread, delivered on the GUI one.
+    _find_result = Signal(int, object)  # search, Path or None if not found
+    # Emitted from the estimate thread, delivered on the GUI one.
+    _estimate_result = Signal(int, object)  # estimate, Preflight or None
 
     def __init__(self):
         super().__init__()
         self._ui()
-        self.target_path: Path
-        self.is_demo: bool
+        self.target_path: Optional[Path] = None
+        self.is_demo: bool = False
         self.file_size: int = 0
+        # Results of searches other than the current one are ignored.
+        self._find_search = 0
+        self._finding = False
+        self._find_requested = False
+        self._recover_path: Optional[Path] = None
+        self._find_result.connect(self._on_find_finished)
+        # Results of estimates other than the latest one are ignored.
+        self._estimate = 0
+        self._throughput: Optional[float] = None
+        self._estimate_result.connect(self._on_estimate_finished)
 
     def _ui(self):
         center_layout = QVBoxLayout(self)
@@ -51,6 +77,7 @@ class PickTargetPage(QWidget):
         self.backup_checkbox.setDisabled(True)
         self.backup_checkbox.toggled.connect(self._update_backup_checkbox)
         self.backup_checkbox.setText(self.tr("Fazer backup do arquivo original"))
+        self.backup_checkbox.toggled.connect(self._start_estimate)
         self.backup_checkbox.setToolTip(self.tr(
             "Cria uma cópia do arquivo UntilThen.pck original antes de instalar a tradução."
         ))
@@ -94,6 +121,16 @@ class PickTargetPage(QWidget):
             """
         )
         
+        self.uninstall_button = QPushButton(self.tr("Desinstalar tradução"))
+        self.uninstall_button.clicked.connect(self._handle_uninstall)
+        self.uninstall_button.setIcon(qtawesome.icon("fa6s.clock-rotate-left"))
+        self.uninstall_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.uninstall_button.setEnabled(False)
+        self.uninstall_button.setToolTip(self.tr(
+            "Restaura o arquivo UntilThen.pck original a partir do backup"
+            " criado na instalação."
+        ))
+
         self.back_button = QPushButton(self)
         self.back_button.setIcon(qtawesome.icon("fa6s.arrow-left"))
         self.back_button.setFixedSize(55, 40)
@@ -102,46 +139,84 @@ class PickTargetPage(QWidget):
 
         layout.addWidget(path_label_box)
         layout.addWidget(buttons_frame)
+        self.estimate_label = QLabel()
+        self.estimate_label.setStyleSheet("color: #6a7282;")
+
         layout.addWidget(self.status_label)
+        layout.addWidget(self.estimate_label)
         layout.addWidget(self.backup_checkbox)
         layout.addWidget(self.next_page_button)
-
-        self.pick_file_dialog = QFileDialog(parent=self)
-        self.pick_file_dialog.setWindowTitle(self.tr("Selecione UntilThen.pck"))
-        self.pick_file_dialog.setFilter(QDir.Filter.Files)
-        self.pick_file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
-        self.pick_file_dialog.setNameFilter("UntilThen.pck (*.pck)")
-
-        self.file_not_found_message = QMessageBox(parent=self)
-        self.file_not_found_message.setWindowTitle(self.tr("Arquivo não encontrado"))
-        self.file_not_found_message.setText(self.tr(
+        layout.addWidget(self.uninstall_button)
+
+    # The dialogs below are only needed once the user acts, so they are
+    # built on first use instead of with the page.
+
+    @cached_property
+    def pick_file_dialog(self) -> QFileDialog:
+        dialog = QFileDialog(parent=self)
+        dialog.setWindowTitle(self.tr("Selecione UntilThen.pck"))
+        dialog.setFilter(QDir.Filter.Files)
+        dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
+        # An interrupted install may have left no UntilThen.pck behind, so
+        # its journal can be picked instead.
+        dialog.setNameFilter("UntilThen.pck (*.pck *.journal)")
+        return dialog
+
+    @cached_property
+    def file_not_found_message(self) -> QMessageBox:
+        message = QMessageBox(parent=self)
+        message.setWindowTitle(self.tr("Arquivo não encontrado"))
+        message.setText(self.tr(
             "UntilThen.pck não pôde ser localizado automaticamente."
             " Por favor, selecione-o manualmente."
         ))
-        self.file_not_found_message.setIcon(QMessageBox.Icon.Warning)
-        self.file_not_found_message.setStandardButtons(
-            QMessageBox.StandardButton.Ok
-        )
-
-        self.file_not_selected_message = QMessageBox(parent=self)
-        self.file_not_selected_message.setWindowTitle(self.tr(
-            "Nenhum arquivo selecionado"
-        ))
-        self.file_not_selected_message.setText(self.tr(
+        message.setIcon(QMessageBox.Icon.Warning)
+        message.setStandardButtons(QMessageBox.StandardButton.Ok)
+        return message
+
+    @cached_property
+    def file_not_selected_message(self) -> QMessageBox:
+        message = QMessageBox(parent=self)
+        message.setWindowTitle(self.tr("Nenhum arquivo selecionado"))
+        message.setText(self.tr(
             "Você não selecionou UntilThen.pck. Por favor, tente novamente."
         ))
-        self.file_not_selected_message.setIcon(QMessageBox.Icon.Information)
-        self.file_not_selected_message.setStandardButtons(
-            QMessageBox.StandardButton.Ok
+        message.setIcon(QMessageBox.Icon.Information)
+        message.setStandardButtons(QMessageBox.StandardButton.Ok)
+        return message
+
+    @cached_property
+    def uninstall_message(self) -> QMessageBox:
+        message = QMessageBox(parent=self)
+        message.setWindowTitle(self.tr("Desinstalar tradução"))
+        message.setText(self.tr(
+            "O arquivo UntilThen.pck original será restaurado a partir do"
+            " backup. Deseja continuar?"
+        ))
+        message.setIcon(QMessageBox.Icon.Question)
+        message.setStandardButtons(
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
-        
+        return message
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Steam is searched in the background as soon as the page shows,
+        # so a found game is usually filled in before the user acts.
+        if self.target_path is None and not self._finding:
+            self._start_find(requested=False)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self.back_button.move(50, self.height() - self.back_button.height() - 25)
         
     def _reset_page(self):
+        self._cancel_find()
         self.target_path = None
         self.file_size = 0
+        self._estimate += 1
+        self._throughput = None
+        self.estimate_label.setText("")
         
         self.path_label.setText("")
         self.status_label.setText(self.tr("UntilThen.pck não selecionado"))
@@ -151,12 +226,14 @@ class PickTargetPage(QWidget):
         self.quick_find_button.setEnabled(True)
         
         self.next_page_button.setEnabled(False)
+        self.uninstall_button.setEnabled(False)
         self.backup_checkbox.setChecked(False)
         self.backup_checkbox.setDisabled(True)
         
         self._update_backup_checkbox()
 
     def _handle_file_pick(self):
+        self._cancel_find()
         self.pick_file_dialog.exec()
 
         selected_files = self.pick_file_dialog.selectedFiles()
@@ -171,14 +248,67 @@ class PickTargetPage(QWidget):
 
     def _handle_next_page(self):
         make_backup = self.backup_checkbox.isChecked()
-        self.finished.emit(self.target_path, self.is_demo, make_backup)
+        self.finished.emit(
+            self.target_path, self.is_demo, make_backup, self._throughput
+        )
 
     def _handle_quick_find(self):
-        path = self._find_util_then_pck_path()
-        if not path:
-            self.file_not_found_message.open()
+        self._start_find(requested=True)
+        return None
 
-        self._validate_file(path)
+    def _start_find(self, requested: bool):
+        self._find_search += 1
+        self._finding = True
+        self._find_requested = requested
+        self.quick_find_button.setEnabled(False)
+        self.status_label.setText(self.tr(
+            "Procurando UntilThen.pck... Use \"Procurar...\" para cancelar."
+        ))
+        self.status_label.setStyleSheet("color: #6a7282; font-weight: bold;")
+
+        # A daemon thread rather than a QThread: a search stuck on a dead
+        # mount must neither block nor abort closing the window.
+        threading.Thread(
+            target=self._run_find, args=(self._find_search,), daemon=True
+        ).start()
+
+    def _run_find(self, search: int):
+        try:
+            path = _find_until_then_pck()
+        except Exception:
+            # Automatic search is best effort; a failure reads as "not
+            # found" and the user can still pick the file by hand.
+            path = None
+        try:
+            self._find_result.emit(search, path)
+        except RuntimeError:
+            # The window was closed while searching.
+            pass
+
+    def _cancel_find(self):
+        if not self._finding:
+            return
+
+        # The search cannot be interrupted, but its result is dropped.
+        self._finding = False
+        self.quick_find_button.setEnabled(True)
+        self.status_label.setText(self.tr("UntilThen.pck não selecionado"))
+        self.status_label.setStyleSheet("color: #6a7282; font-weight: bold;")
+
+    def _on_find_finished(self, search: int, path: Optional[Path]):
+        if not self._finding or search != self._find_search:
+            return None
+        self._finding = False
+        self.quick_find_button.setEnabled(True)
+
+        if path is not None:
+            self._validate_file(path)
+        elif self._find_requested:
+            self.file_not_found_message.open()
+            self._validate_file(None)
+        else:
+            self.status_label.setText(self.tr("UntilThen.pck não selecionado"))
+        return None
 
     def _validate_file(self, path: Path | None):
 
@@ -186,9 +316,18 @@ class PickTargetPage(QWidget):
             self._set_status(is_valid=False)
             return None
 
+        if InstallJournal(path).exists():
+            self._recover(path.parent / PCK_NAME)
+            return None
+
         is_demo = True if path.parent.name == "Until Then Demo" else False
         if path.exists() and path.is_file() and path.suffix == ".pck":
-            self._set_status(is_valid=True, is_demo=is_demo)
+            try:
+                probe = probe_pck(path)
+            except (OSError, PCKFormatError):
+                probe = None
+
+            self._set_status(is_valid=True, is_demo=is_demo, probe=probe)
             self.target_path = path
             self.is_demo = is_demo
             self.file_size = path.stat().st_size
@@ -198,44 +337,186 @@ class PickTargetPage(QWidget):
             self.next_page_button.setEnabled(True)
             self.next_page_button.setDefault(True)
             self.backup_checkbox.setEnabled(True)
+            self.uninstall_button.setEnabled(has_backup(path))
             self._update_backup_checkbox()
+            self._throughput = None
+            self._start_estimate()
             return None
 
         self._set_status(is_valid=False)
         return None
 
-    def _find_util_then_pck_path(self):
-        for game_id in [self.FULL_GAME_ID, self.DEMO_GAME_ID]:
-            install_dir = self._find_game_path_by_id(game_id)
-            if install_dir is None:
-                continue
+    def _start_estimate(self):
+        """
+        Works out in the background how much room the install needs and
+        how long it should take, so the user sees it before deciding.
+        """
+        self._estimate += 1
+        if self.target_path is None:
+            return
+        self.estimate_label.setText(self.tr("Calculando o espaço necessário..."))
+        self.estimate_label.setStyleSheet("color: #6a7282;")
+
+        installer = Installer(
+            self.target_path,
+            partial(open_payload, TRANSLATION_FILES),
+            demo=self.is_demo,
+            make_backup=self.backup_checkbox.isChecked(),
+            throughput=self._throughput,
+        )
+        threading.Thread(
+            target=self._run_estimate,
+            args=(self._estimate, installer),
+            daemon=True,
+        ).start()
 
-            candidate = install_dir / "UntilThen.pck"
-            if candidate.is_file():
-                abs_file_path = candidate.resolve()
-                return abs_file_path
+    def _run_estimate(self, estimate: int, installer: Installer):
+        try:
+            preflight = installer.estimate(Path(tempfile.gettempdir()))
+        except Exception:
+            # Only informative; the install checks again before writing.
+            preflight = None
+        try:
+            self._estimate_result.emit(estimate, preflight)
+        except RuntimeError:
+            # The window was closed meanwhile.
+            pass
+
+    def _on_estimate_finished(
+            self,
+            estimate: int,
+            preflight: Optional[Preflight],
+    ):
+        if estimate != self._estimate:
+            return
+        if preflight is None:
+            self.estimate_label.setText("")
+            return
+        self._throughput = preflight.throughput
+        self.estimate_label.setText("\n".join(preflight.summary()))
+        if all(need.enough for need in preflight.needs):
+            self.estimate_label.setStyleSheet("color: #6a7282;")
+        else:
+            self.estimate_label.setStyleSheet("color: #fb2c36;")
+
+    def _recover(self, target_path: Path):
+        """
+        Finishes or undoes the install of `target_path` that was
+        interrupted, then validates the PCK it left. Until then the game
+        may have no UntilThen.pck at all.
+        """
+        self.pick_file_button.setEnabled(False)
+        self.quick_find_button.setEnabled(False)
+        self.next_page_button.setEnabled(False)
+        self.status_label.setText(
+            self.tr("Concluindo uma instalação interrompida...")
+        )
+        self.status_label.setStyleSheet("color: #6a7282; font-weight: bold;")
+
+        recover_thread = QThread(self)
+        recover_worker = _RecoverWorker()
+
+        recover_worker.moveToThread(recover_thread)
+        # Without a direct connection the lambda would run in the thread
+        # that owns recover_thread, which is the GUI one.
+        recover_thread.started.connect(
+            lambda: recover_worker.run(target_path),
+            Qt.ConnectionType.DirectConnection,
+        )
+
+        self._recover_path = target_path
+        recover_worker.finished.connect(self._on_recover_finished)
+        recover_worker.error.connect(self._on_recover_error)
+
+        recover_worker.finished.connect(recover_thread.quit)
+        recover_worker.error.connect(recover_thread.quit)
+        recover_thread.finished.connect(recover_worker.deleteLater)
+        recover_thread.finished.connect(recover_thread.deleteLater)
+
+        recover_thread.start()
+
+    def _on_recover_finished(self, action: Optional[str]):
+        self.pick_file_button.setEnabled(True)
+        self.quick_find_button.setEnabled(True)
+        self._validate_file(self._recover_path)
+        if action is not None and self.target_path is not None:
+            self.status_label.setText(
+                self.status_label.text() + "\n"
+                + event_message(InstallRecovered(action))
+            )
+
+    def _on_recover_error(self, error: Exception):
+        self.pick_file_button.setEnabled(True)
+        self.quick_find_button.setEnabled(True)
+        self.status_label.setText(
+            self.tr("Não foi possível concluir a instalação interrompida: ")
+            + str(error)
+        )
+        self.status_label.setStyleSheet("color: #fb2c36; font-weight: bold;")
+
+    def _handle_uninstall(self):
+        answer = self.uninstall_message.exec()
+        if answer != QMessageBox.StandardButton.Yes:
+            return None
+
+        self.uninstall_button.setEnabled(False)
+        self.next_page_button.setEnabled(False)
+        self.status_label.setText(self.tr("Restaurando o arquivo original..."))
+        self.status_label.setStyleSheet("color: #6a7282; font-weight: bold;")
+
+        target_path = self.target_path
+        restore_thread = QThread(self)
+        restore_worker = _RestoreWorker()
+
+        restore_worker.moveToThread(restore_thread)
+        # Without a direct connection the lambda would run in the thread
+        # that owns restore_thread, which is the GUI one.
+        restore_thread.started.connect(
+            lambda: restore_worker.run(target_path),
+            Qt.ConnectionType.DirectConnection,
+        )
+
+        restore_worker.finished.connect(self._on_uninstall_finished)
+        restore_worker.error.connect(self._on_uninstall_error)
+
+        restore_worker.finished.connect(restore_thread.quit)
+        restore_worker.error.connect(restore_thread.quit)
+        restore_thread.finished.connect(restore_worker.deleteLater)
+        restore_thread.finished.connect(restore_thread.deleteLater)
 
+        restore_thread.start()
         return None
 
+    def _on_uninstall_finished(self):
+        self._validate_file(self.target_path)
+        self.status_label.setText(
+            self.tr("Tradução desinstalada. O arquivo original foi restaurado.")
+        )
+
+    def _on_uninstall_error(self, error: Exception):
+        self.next_page_button.setEnabled(True)
+        self.uninstall_button.setEnabled(has_backup(self.target_path))
+        self.status_label.setText(
+            self.tr("Não foi possível restaurar o original: ") + str(error)
+        )
+        self.status_label.setStyleSheet("color: #fb2c36; font-weight: bold;")
+
     def _update_backup_checkbox(self):
         base_text = self.tr("Fazer backup do arquivo original")
-        size_str = self._format_file_size(self.file_size)
+        size_str = format_file_size(self.file_size)
         
         if self.backup_checkbox.isChecked():
-            self.backup_checkbox.setText(f"{base_text} (ocupará mais {size_str})")
+            self.backup_checkbox.setText(f"{base_text} (até {size_str} a mais)")
             
         else:
             self.backup_checkbox.setText(base_text)
 
-    @staticmethod
-    def _format_file_size(size_bytes: int) -> str:
-        for unit in ["B", "KB", "MB", "GB"]:
-            if size_bytes < 1024:
-                return f"{size_bytes:.2f} {unit}"
-            size_bytes /= 1024
-        return f"{size_bytes:.2f} TB"
-
-    def _set_status(self, is_valid: bool, is_demo: bool = False):
+    def _set_status(
+            self,
+            is_valid: bool,
+            is_demo: bool = False,
+            probe: Optional[PCKProbe] = None,
+    ):
         if is_valid:
             if is_demo:
                 demo_message = self.tr(
@@ -246,7 +527,7 @@ class PickTargetPage(QWidget):
 
             self.status_label.setText(self.tr(
                 "UntilThen.pck é valido."
-            ) + demo_message)
+            ) + demo_message + self._probe_message(probe))
             self.status_label.setStyleSheet(
                 "color: #00c951; font-weight: bold;"
             )
@@ -258,109 +539,72 @@ class PickTargetPage(QWidget):
                 "color: #fb2c36; font-weight: bold;"
             )
 
-    def _find_game_path_by_id(self, game_id: int):
-        steam_path = self._find_steam_path()
-        if not steam_path:
-            return None
+    def _probe_message(self, probe: Optional[PCKProbe]) -> str:
+        if probe is None:
+            return ""
 
-        library_folders_path = steam_path / "steamapps" / "libraryfolders.vdf"
-        try:
-            with open(library_folders_path, encoding="utf-8") as file:
-                library_data = vdf.load(file)
-        except FileNotFoundError:
-            return None
+        message = (
+            "\n" + self.tr("Jogo: Godot ") + probe.godot_version
+            + " · " + str(probe.file_count) + self.tr(" arquivos")
+        )
+        if probe.marker is not None:
+            version = probe.marker.get("version")
+            if version:
+                message += "\n" + self.tr("Tradução ") + str(version) \
+                    + self.tr(" já instalada.")
+            else:
+                message += "\n" + self.tr("Tradução já instalada.")
+        return message
 
-        libraries = []
-        folders = library_data.get("libraryfolders", {})
-        for entry in folders.values():
-            if isinstance(entry, dict) and "path" in entry:
-                libraries.append(Path(entry["path"]))
-            elif isinstance(entry, dict):
-                libraries.append(Path(str(entry)))
-
-        if not libraries:
-            libraries.append(steam_path)
-
-        for library_path in libraries:
-            manifest_path = (library_path
-                             / "steamapps"
-                             / f"appmanifest_{game_id}.acf")
-            if manifest_path.exists():
-                with open(manifest_path, encoding="utf-8") as file:
-                    manifest = vdf.load(file)
-                install_dir = manifest["AppState"]["installdir"]
-                game_path = (library_path
-                             / "steamapps"
-                             / "common"
-                             / install_dir
-                             )
-                if game_path.exists():
-                    return Path(game_path.resolve())
 
+def _find_until_then_pck() -> Optional[Path]:
+    steam_path = find_steam_path()
+    if steam_path is None:
         return None
 
-    @staticmethod
-    def _find_steam_path():
-
-        system = platform.system()
-        possible_paths = []
-
-        match system:
-            case "Windows":
-                import winreg
-
-                try:
-                    steam_key = winreg.OpenKey(
-                        winreg.HKEY_CURRENT_USER,
-                        r"Software\Valve\Steam"
-                    )
-                    steam_path = winreg.QueryValueEx(
-                        steam_key,
-                        "SteamPath"
-                    )
-                    winreg.CloseKey(steam_key)
-                except OSError:
-                    steam_path = None
-
-                if steam_path:
-                    possible_paths.append(Path(steam_path[0]))
-                possible_paths.extend([
-                    Path(os.environ.get("ProgramFiles(x86)", "")) / "Steam",
-                    Path(os.environ.get("ProgramFiles", "")) / "Steam",
-                ])
-
-            case "Linux":
-                possible_paths = [
-                    Path().home()
-                    / ".steam"
-                    / "steam",
-                    Path().home()
-                    / ".local"
-                    / "share"
-                    / "Steam",
-                    Path().home()
-                    / ".local"
-                    / "share"
-                    / "Steam",
-                    Path().home()
-                    / "snap"
-                    / "steam"
-                    / "common"
-                    / ".local"
-                    / "share"
-                    / "Steam",
-                    Path().home()
-                    / ".var"
-                    / "app"
-                    / "com.valvesoftware.Steam"
-                    / "data"
-                    / "Steam",
-                ]
-            case _:
-                return None
-
-        for path in possible_paths:
-            if path.resolve().exists():
-                return path
+    game_ids = [PickTargetPage.FULL_GAME_ID, PickTargetPage.DEMO_GAME_ID]
+    install_dirs = SteamLibraryIndex(steam_path).find(game_ids)
+    candidates = [
+        install_dirs[game_id] / PCK_NAME
+        for game_id in game_ids
+        if game_id in install_dirs
+    ]
+    # The install dirs may be on a mount that stopped answering. A game
+    # whose install was interrupted is found even without its PCK, so
+    # the install can be recovered.
+    found = probe_paths(
+        lambda candidate: (
+            candidate.resolve()
+            if candidate.is_file() or InstallJournal(candidate).exists()
+            else None
+        ),
+        candidates,
+    )
+    for path in found:
+        if isinstance(path, Path):
+            return path
+
+    return None
+
+
+class _RecoverWorker(QObject):
+    finished = Signal(object)  # InstallRecovered action or None
+    error = Signal(Exception)
+
+    def run(self, target_path: Path):
+        try:
+            self.finished.emit(recover_install(target_path))
+        except Exception as e:
+            self.error.emit(e)
 
-        return None
+
+class _RestoreWorker(QObject):
+    finished = Signal()
+    error = Signal(Exception)
+
+    def run(self, target_path: Path):
+        try:
+            restore_original(target_path)
+            self.finished.emit()
+        except Exception as e:
+            self.error.emit(e)
@@ -1,5 +1,7 @@
-from PySide6.QtCore import Signal
-from PySide6.QtGui import QPixmap, Qt
+from collections import OrderedDict
+
+from PySide6.QtCore import Signal, QObject, QTimer
+from PySide6.QtGui import QPixmap, Qt, QImage, QImageReader
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QSizePolicy, \
     QVBoxLayout, QFrame, QPushButton
 
@@ -15,7 +17,6 @@ class WelcomePage(QWidget):
         layout = QHBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
 
-        self.banner = QPixmap(":banner")
         self.banner_label = QLabel()
         self.banner_label.setSizePolicy(
             QSizePolicy.Policy.Minimum,
@@ -78,6 +79,7 @@ class WelcomePage(QWidget):
         layout.addWidget(self.banner_label)
         layout.addWidget(message_and_button_frame, 1)
 
+        self.banner = _BannerRenderer(":banner", self.banner_label)
         self._update_banner_size()
 
     def resizeEvent(self, event):
@@ -86,14 +88,88 @@ class WelcomePage(QWidget):
         self._update_banner_size()
 
     def _update_banner_size(self):
-        if self.banner.isNull():
+        self.banner.render(self.banner_label.height())
+
+
+class _BannerRenderer(QObject):
+    """
+    Keeps `label` showing the banner at a given height. The image is
+    decoded once, no taller than MAX_HEIGHT, and scaled pixmaps are kept
+    in a small LRU cache by height bucket. While the height keeps
+    changing a fast scale is shown; a smooth one replaces it once the
+    resize has settled for SETTLE_MS.
+    """
+
+    MAX_HEIGHT = 1440
+    BUCKET = 8
+    CACHE_SIZE = 8
+    SETTLE_MS = 150
+
+    def __init__(self, resource: str, label: QLabel):
+        super().__init__(label)
+        self._label = label
+        self._source = QPixmap.fromImage(self._decode(resource))
+        self._cache: OrderedDict[tuple[int, bool], QPixmap] = OrderedDict()
+        self._height = 0
+
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(self.SETTLE_MS)
+        self._settle_timer.timeout.connect(self._render_smooth)
+
+    def _decode(self, resource: str) -> QImage:
+        reader = QImageReader(resource)
+        size = reader.size()
+        # Nothing taller than the screen is ever shown.
+        screen = self._label.screen()
+        max_height = self.MAX_HEIGHT
+        if screen is not None:
+            max_height = min(max_height, int(
+                screen.size().height() * screen.devicePixelRatio()
+            ))
+        if size.isValid() and size.height() > max_height:
+            # Decoding straight to the smaller size skips the full-size
+            # image entirely for formats that support it.
+            reader.setScaledSize(size.scaled(
+                size.width(),
+                max_height,
+                Qt.AspectRatioMode.KeepAspectRatio,
+            ))
+        return reader.read()
+
+    def render(self, height: int):
+        if self._source.isNull() or height <= 0:
             return
 
-        available_size = self.banner_label.size()
-
-        scaled_pixmap = self.banner.scaledToHeight(
-            available_size.height(),
-            Qt.TransformationMode.FastTransformation,
-        )
-
-        self.banner_label.setPixmap(scaled_pixmap)
+        self._height = height
+        self._show(smooth=False)
+        self._settle_timer.start()
+
+    def _render_smooth(self):
+        self._show(smooth=True)
+
+    def _show(self, smooth: bool):
+        ratio = self._label.devicePixelRatioF()
+        bucket = int(self._height * ratio) // self.BUCKET * self.BUCKET
+        bucket = max(self.BUCKET, min(bucket, self._source.height()))
+        key = (bucket, smooth)
+
+        pixmap = self._cache.get(key)
+        if pixmap is None:
+            if not smooth and (bucket, True) in self._cache:
+                pixmap = self._cache[(bucket, True)]
+                key = (bucket, True)
+            else:
+                pixmap = self._source.scaledToHeight(
+                    bucket,
+                    Qt.TransformationMode.SmoothTransformation if smooth
+                    else Qt.TransformationMode.FastTransformation,
+                )
+                pixmap.setDevicePixelRatio(ratio)
+                self._cache[key] = pixmap
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        self._cache.move_to_end(key)
+
+        if self._label.pixmap().cacheKey() != pixmap.cacheKey():
+            self._label.setPixmap(pixmap)
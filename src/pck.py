@@ -0,0 +1,516 @@
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, NamedTuple, Optional
+
+PACK_HEADER_MAGIC = 0x43504447  # "GDPC"
+PACK_FORMAT_VERSION = 2
+PACK_DIR_ENCRYPTED = 1 << 0
+PACK_REL_FILEBASE = 1 << 1
+PACK_FILE_ENCRYPTED = 1 << 0
+PCK_PADDING = 16
+RES_PREFIX = "res://"
+
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+_HEADER = struct.Struct("<IIIIIIQ64xI")
+_ENTRY_TAIL = struct.Struct("<QQ16sI")
+
+# The installer leaves a small JSON record after the last entry, followed
+# by its length and this magic. Godot ignores bytes past the entries.
+_MARKER_MAGIC = b"UTPTBR01"
+_MARKER_TRAILER = struct.Struct("<I8s")
+_MARKER_MAX_SIZE = 64 * 1024
+
+_probe_cache: dict[tuple[str, int, int], "PCKProbe"] = {}
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class PCKFormatError(Exception):
+    pass
+
+
+@dataclass
+class PCKEntry:
+    path: str
+    offset: int  # relative to PCKIndex.file_base
+    size: int
+    md5: bytes = bytes(16)
+    flags: int = 0
+
+
+@dataclass
+class PCKIndex:
+    ver_major: int
+    ver_minor: int
+    ver_patch: int
+    pack_flags: int
+    file_base: int
+    entries: list[PCKEntry] = field(default_factory=list)
+    format_version: int = PACK_FORMAT_VERSION
+
+    @property
+    def godot_version(self) -> str:
+        return f"{self.ver_major}.{self.ver_minor}.{self.ver_patch}"
+
+    @property
+    def uses_res_prefix(self) -> bool:
+        return not self.entries or self.entries[0].path.startswith(RES_PREFIX)
+
+    def entry_map(self) -> dict[str, PCKEntry]:
+        return {normalize_path(e.path): e for e in self.entries}
+
+    def pck_path(self, path: str) -> str:
+        """
+        Returns `path` spelled the way this archive stores its paths.
+        """
+        path = normalize_path(path)
+        return RES_PREFIX + path if self.uses_res_prefix else path
+
+
+@dataclass
+class PCKProbe:
+    godot_version: str
+    file_count: int
+    marker: Optional[dict]
+
+
+class PatchEntry(NamedTuple):
+    path: str
+    size: int
+    open: Callable[[], BinaryIO]
+
+
+def normalize_path(path: str) -> str:
+    path = path.replace("\\", "/")
+    if path.startswith(RES_PREFIX):
+        path = path[len(RES_PREFIX):]
+    return path.lstrip("/")
+
+
+def _pad(alignment: int, n: int) -> int:
+    rest = n % alignment
+    return alignment - rest if rest else 0
+
+
+def _encoded_path(path: str) -> bytes:
+    data = path.encode("utf-8")
+    return data + bytes(_pad(4, len(data)))
+
+
+def directory_size(entries: Iterable[PCKEntry]) -> int:
+    """
+    Size in bytes of the header plus the file table for `entries`.
+    """
+    size = _HEADER.size
+    for entry in entries:
+        size += 4 + len(_encoded_path(entry.path)) + _ENTRY_TAIL.size
+    return size
+
+
+def _read_header(file: BinaryIO) -> tuple:
+    file.seek(0)
+    raw = file.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise PCKFormatError("Arquivo muito pequeno para ser um PCK")
+
+    header = _HEADER.unpack(raw)
+    if header[0] != PACK_HEADER_MAGIC:
+        raise PCKFormatError("Cabeçalho PCK inválido")
+    return header
+
+
+def read_index(file: BinaryIO) -> PCKIndex:
+    """
+    Reads the header and file table of a standalone Godot 4 PCK.
+    Only the first few KB of the file are touched.
+    """
+    (_, format_version, major, minor, patch, pack_flags, file_base,
+     file_count) = _read_header(file)
+
+    if format_version != PACK_FORMAT_VERSION:
+        raise PCKFormatError(
+            f"Versão de PCK não suportada ({format_version})"
+        )
+    if pack_flags & PACK_DIR_ENCRYPTED:
+        raise PCKFormatError("Diretório do PCK criptografado")
+
+    entries = []
+    for _ in range(file_count):
+        (path_len,) = struct.unpack("<I", file.read(4))
+        path = file.read(path_len).rstrip(b"\0").decode("utf-8")
+        offset, size, md5, flags = _ENTRY_TAIL.unpack(
+            file.read(_ENTRY_TAIL.size)
+        )
+        entries.append(PCKEntry(path, offset, size, md5, flags))
+
+    return PCKIndex(
+        ver_major=major,
+        ver_minor=minor,
+        ver_patch=patch,
+        pack_flags=pack_flags,
+        file_base=file_base,
+        entries=entries,
+        format_version=format_version,
+    )
+
+
+def write_index(file: BinaryIO, index: PCKIndex) -> None:
+    """
+    Writes the header and file table of `index` at the start of `file`.
+    """
+    file.seek(0)
+    file.write(_HEADER.pack(
+        PACK_HEADER_MAGIC,
+        index.format_version,
+        index.ver_major,
+        index.ver_minor,
+        index.ver_patch,
+        index.pack_flags,
+        index.file_base,
+        len(index.entries),
+    ))
+    for entry in index.entries:
+        path = _encoded_path(entry.path)
+        file.write(struct.pack("<I", len(path)))
+        file.write(path)
+        file.write(_ENTRY_TAIL.pack(
+            entry.offset, entry.size, entry.md5, entry.flags
+        ))
+
+
+def copy_range(
+        src: BinaryIO,
+        dst: BinaryIO,
+        size: int,
+        on_chunk: Optional[Callable[[int], None]] = None,
+        hasher=None,
+) -> None:
+    """
+    Copies `size` bytes from the current position of `src` to `dst`
+    using a single reusable buffer.
+    """
+    buffer = bytearray(min(COPY_BUFFER_SIZE, max(size, 1)))
+    view = memoryview(buffer)
+    remaining = size
+    while remaining:
+        chunk = view[:min(remaining, len(buffer))]
+        read = src.readinto(chunk)
+        if not read:
+            raise PCKFormatError("Fim de arquivo inesperado")
+        dst.write(chunk[:read])
+        if hasher is not None:
+            hasher.update(chunk[:read])
+        remaining -= read
+        if on_chunk:
+            on_chunk(read)
+
+
+def build_patched_pck(
+        source_path: Path,
+        output_path: Path,
+        patches: Iterable[PatchEntry],
+        progress: Optional[ProgressCallback] = None,
+) -> PCKIndex:
+    """
+    Writes to `output_path` a copy of the PCK at `source_path` where the
+    entries in `patches` replace (or are added to) the original ones.
+    Untouched entries are streamed as is; patched ones get a fresh MD5.
+    """
+    with open(source_path, "rb") as src:
+        source_index = read_index(src)
+
+        patch_map: dict[str, PatchEntry] = {}
+        for patch in patches:
+            patch_map[normalize_path(patch.path)] = patch
+
+        entries: list[PCKEntry] = []
+        sources: list[PCKEntry | PatchEntry] = []
+        for entry in source_index.entries:
+            patch = patch_map.pop(normalize_path(entry.path), None)
+            if patch is None:
+                entries.append(PCKEntry(
+                    entry.path, 0, entry.size, entry.md5, entry.flags
+                ))
+                sources.append(entry)
+            else:
+                entries.append(PCKEntry(entry.path, 0, patch.size))
+                sources.append(patch)
+        for path, patch in patch_map.items():
+            entries.append(PCKEntry(source_index.pck_path(path), 0, patch.size))
+            sources.append(patch)
+
+        header_size = directory_size(entries)
+        file_base = header_size + _pad(PCK_PADDING, header_size)
+        offset = 0
+        for entry in entries:
+            entry.offset = offset
+            offset += entry.size + _pad(PCK_PADDING, entry.size)
+
+        output_index = PCKIndex(
+            ver_major=source_index.ver_major,
+            ver_minor=source_index.ver_minor,
+            ver_patch=source_index.ver_patch,
+            pack_flags=source_index.pack_flags & ~PACK_DIR_ENCRYPTED,
+            file_base=file_base,
+            entries=entries,
+        )
+
+        total = file_base + offset
+        done = 0
+
+        def advance(n: int):
+            nonlocal done
+            done += n
+            if progress:
+                progress(done, total)
+
+        with open(output_path, "wb") as dst:
+            # The file table is written twice: once to reserve its space and
+            # once more after the MD5 of every patched entry is known.
+            write_index(dst, output_index)
+            dst.write(bytes(file_base - header_size))
+            advance(file_base)
+
+            for entry, source in zip(entries, sources):
+                if isinstance(source, PCKEntry):
+                    src.seek(source_index.file_base + source.offset)
+                    copy_range(src, dst, entry.size, advance)
+                else:
+                    md5 = hashlib.md5()
+                    with source.open() as stream:
+                        copy_range(stream, dst, entry.size, advance, md5)
+                    entry.md5 = md5.digest()
+                padding = _pad(PCK_PADDING, entry.size)
+                dst.write(bytes(padding))
+                advance(padding)
+
+            write_index(dst, output_index)
+
+    return output_index
+
+
+@dataclass
+class AppendUndo:
+    """
+    What `append_patches` needs to turn a patched PCK back into the
+    original: its old length and its old header and file table.
+    """
+    original_size: int
+    original_head: bytes
+
+    _MAGIC = b"UTPCKAPP"
+    _LAYOUT = struct.Struct("<8sQI")
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as file:
+            file.write(self._LAYOUT.pack(
+                self._MAGIC, self.original_size, len(self.original_head)
+            ))
+            file.write(self.original_head)
+            # Only useful if it survives a crash of the append it undoes.
+            file.flush()
+            os.fsync(file.fileno())
+
+    @classmethod
+    def load(cls, path: Path) -> "AppendUndo":
+        with open(path, "rb") as file:
+            magic, original_size, head_size = cls._LAYOUT.unpack(
+                file.read(cls._LAYOUT.size)
+            )
+            if magic != cls._MAGIC:
+                raise PCKFormatError("Arquivo de backup inválido")
+            return cls(original_size, file.read(head_size))
+
+
+def _data_start(index: PCKIndex) -> int:
+    if not index.entries:
+        return index.file_base
+    return index.file_base + min(e.offset for e in index.entries)
+
+
+def fits_in_place(index: PCKIndex, patches: Iterable[PatchEntry]) -> bool:
+    """
+    Whether `append_patches` can add `patches` to the PCK of `index`:
+    its file table, new paths included, must still end before the first
+    entry.
+    """
+    entry_map = index.entry_map()
+    new_entries = [
+        PCKEntry(index.pck_path(patch.path), 0, patch.size)
+        for patch in patches
+        if normalize_path(patch.path) not in entry_map
+    ]
+    return directory_size(index.entries + new_entries) <= _data_start(index)
+
+
+def append_patches(
+        path: Path,
+        patches: Iterable[PatchEntry],
+        progress: Optional[ProgressCallback] = None,
+        on_undo: Optional[Callable[[AppendUndo], None]] = None,
+) -> AppendUndo:
+    """
+    Patches the PCK at `path` in place: the patched entries are appended
+    to the end of the file and only the header and file table are
+    rewritten, so the original entries are left where they were.
+    `on_undo` gets the undo record before the file is first written to.
+
+    Raises PCKFormatError when new paths would not fit in the space
+    before the first entry; callers should then rebuild the archive.
+    """
+    patches = list(patches)
+
+    with open(path, "r+b") as file:
+        index = read_index(file)
+        original_size = file.seek(0, 2)
+
+        entry_map = index.entry_map()
+        new_entries = []
+        for patch in patches:
+            key = normalize_path(patch.path)
+            if key not in entry_map:
+                entry = PCKEntry(index.pck_path(key), 0, patch.size)
+                entry_map[key] = entry
+                new_entries.append(entry)
+
+        index.entries.extend(new_entries)
+        head_size = directory_size(index.entries)
+        if head_size > _data_start(index):
+            raise PCKFormatError("Sem espaço no índice do PCK")
+
+        file.seek(0)
+        original_head = file.read(head_size)
+        file.seek(original_size)
+        if on_undo:
+            on_undo(AppendUndo(original_size, original_head))
+
+        total = sum(patch.size for patch in patches) + head_size
+        done = 0
+
+        def advance(n: int):
+            nonlocal done
+            done += n
+            if progress:
+                progress(done, total)
+
+        try:
+            position = original_size
+            for patch in patches:
+                padding = _pad(PCK_PADDING, position - index.file_base)
+                file.write(bytes(padding))
+                position += padding
+
+                md5 = hashlib.md5()
+                with patch.open() as stream:
+                    copy_range(stream, file, patch.size, advance, md5)
+
+                entry = entry_map[normalize_path(patch.path)]
+                entry.offset = position - index.file_base
+                entry.size = patch.size
+                entry.md5 = md5.digest()
+                entry.flags = 0
+                position += patch.size
+
+            # The new entries must be on disk before the file table points
+            # at them, otherwise a crash could leave a dangling index.
+            file.flush()
+            os.fsync(file.fileno())
+
+            write_index(file, index)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            # A file table written halfway leaves the PCK unreadable.
+            file.seek(0)
+            file.write(original_head)
+            file.truncate(original_size)
+            file.flush()
+            raise
+        advance(head_size)
+
+    return AppendUndo(original_size, original_head)
+
+
+def undo_append(path: Path, undo: AppendUndo) -> None:
+    """
+    Restores a PCK patched by `append_patches` to its original bytes.
+    """
+    with open(path, "r+b") as file:
+        file.write(undo.original_head)
+        file.truncate(undo.original_size)
+
+
+def read_install_marker(file: BinaryIO) -> Optional[dict]:
+    """
+    Returns the record left by `write_install_marker`, if the file ends
+    with one.
+    """
+    end = file.seek(0, os.SEEK_END)
+    if end < _MARKER_TRAILER.size:
+        return None
+
+    file.seek(end - _MARKER_TRAILER.size)
+    length, magic = _MARKER_TRAILER.unpack(file.read(_MARKER_TRAILER.size))
+    if (magic != _MARKER_MAGIC or length > _MARKER_MAX_SIZE
+            or length > end - _MARKER_TRAILER.size):
+        return None
+
+    file.seek(end - _MARKER_TRAILER.size - length)
+    try:
+        return json.loads(file.read(length))
+    except ValueError:
+        return None
+
+
+def write_install_marker(path: Path, marker: dict) -> None:
+    data = json.dumps(marker).encode("utf-8")
+    with open(path, "r+b") as file:
+        file.seek(0, os.SEEK_END)
+        file.write(data)
+        file.write(_MARKER_TRAILER.pack(len(data), _MARKER_MAGIC))
+
+
+def check_pck(path: Path) -> None:
+    """
+    Raises PCKFormatError unless the PCK at `path` looks complete: its
+    header is valid and, for the format this module reads, every entry
+    of the file table lies within the file.
+    """
+    with open(path, "rb") as file:
+        header = _read_header(file)
+        if header[1] != PACK_FORMAT_VERSION:
+            return
+        try:
+            index = read_index(file)
+        except (struct.error, UnicodeDecodeError):
+            raise PCKFormatError("Índice do PCK incompleto")
+        size = file.seek(0, os.SEEK_END)
+
+    for entry in index.entries:
+        if index.file_base + entry.offset + entry.size > size:
+            raise PCKFormatError("PCK incompleto")
+
+
+def probe_pck(path: Path) -> PCKProbe:
+    """
+    Reads only the header and the install marker of the PCK at `path`.
+    Results are cached by path, modification time and size.
+    """
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    probe = _probe_cache.get(key)
+    if probe is not None:
+        return probe
+
+    with open(path, "rb", buffering=0) as file:
+        (_, _, major, minor, patch, _, _, file_count) = _read_header(file)
+        marker = read_install_marker(file)
+
+    probe = PCKProbe(f"{major}.{minor}.{patch}", file_count, marker)
+    _probe_cache[key] = probe
+    return probe
@@ -0,0 +1,104 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+# Snapshots per second a ProgressAggregator hands on at most by default.
+EMIT_RATE = 30.0
+
+
+@dataclass
+class ProgressSnapshot:
+    files_done: int
+    files_total: int
+    bytes_done: int
+    bytes_total: int
+    names: list[str] = field(default_factory=list)
+
+
+class ProgressAggregator:
+    """
+    Collects progress reported from any number of threads and hands it
+    to `emit` at most `rate` times per second. The names reported in
+    between are delivered together, in order, with the next snapshot.
+    `emit` runs under a lock, so it should only hand the snapshot off
+    (e.g. emit a queued Qt signal).
+    """
+
+    def __init__(
+            self,
+            emit: Callable[[ProgressSnapshot], None],
+            rate: float = EMIT_RATE,
+    ):
+        self._emit = emit
+        self._interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._files_done = 0
+        self._files_total = 0
+        self._bytes_done = 0
+        self._bytes_total = 0
+        self._names: list[str] = []
+        self._last_emit = 0.0
+
+    def set_total(self, files: int, nbytes: int) -> None:
+        with self._lock:
+            self._files_total = files
+            self._bytes_total = nbytes
+
+    def add(self, name: str, nbytes: int) -> None:
+        with self._lock:
+            self._files_done += 1
+            self._bytes_done += nbytes
+            self._names.append(name)
+
+            now = time.monotonic()
+            if now - self._last_emit >= self._interval:
+                self._last_emit = now
+                self._emit(self._take())
+
+    def flush(self) -> None:
+        with self._lock:
+            self._last_emit = time.monotonic()
+            self._emit(self._take())
+
+    def _take(self) -> ProgressSnapshot:
+        names, self._names = self._names, []
+        return ProgressSnapshot(
+            self._files_done,
+            self._files_total,
+            self._bytes_done,
+            self._bytes_total,
+            names,
+        )
+
+
+class TransferRate:
+    """
+    Bytes per second of a count sampled now and then, smoothed so a
+    stalled or bursty write does not make the estimate jump around.
+    """
+
+    def __init__(self, smoothing: float = 0.3):
+        self._smoothing = smoothing
+        self._last: Optional[tuple[float, int]] = None
+        self.rate: Optional[float] = None
+
+    def update(self, done: int, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        if self._last is not None:
+            last_time, last_done = self._last
+            if now <= last_time:
+                return
+            rate = max(0, done - last_done) / (now - last_time)
+            self.rate = rate if self.rate is None else (
+                self._smoothing * rate + (1 - self._smoothing) * self.rate
+            )
+        self._last = (now, done)
+
+    def eta(self, remaining: int) -> Optional[float]:
+        """
+        Seconds left to write `remaining` bytes, once there is a rate.
+        """
+        if not self.rate:
+            return None
+        return max(0, remaining) / self.rate
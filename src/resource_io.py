@@ -0,0 +1,108 @@
+import io
+import mmap
+
+
+class ResourceReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over a Qt resource (":alias") or a
+    plain file, suitable for `zipfile.ZipFile`. Plain files are memory
+    mapped and uncompressed resources are read straight from the memory
+    Qt already has mapped; other resources are read through a QFile.
+    Only Qt resources need QtCore.
+    """
+
+    def __init__(self, resource: str):
+        super().__init__()
+        self._resource = None
+        self._mmap = None
+        self._view = None
+        self._file = None
+        self._position = 0
+
+        if not resource.startswith(":"):
+            with open(resource, "rb") as file:
+                size = file.seek(0, io.SEEK_END)
+                # Empty files cannot be mapped.
+                if size:
+                    self._mmap = mmap.mmap(
+                        file.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+            self._view = memoryview(self._mmap if size else b"")
+            self._size = size
+            return
+
+        from PySide6.QtCore import QFile, QResource
+
+        self._resource = QResource(resource)
+        if (self._resource.isValid()
+                and self._resource.compressionAlgorithm()
+                == QResource.Compression.NoCompression):
+            self._view = memoryview(self._resource.data())
+            self._size = self._view.nbytes
+        else:
+            self._file = QFile(resource)
+            if not self._file.open(QFile.OpenModeFlag.ReadOnly):
+                raise OSError(f"Falha ao abrir {resource}")
+            self._size = self._file.size()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("Posição negativa")
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        target = memoryview(buffer).cast("B")
+        count = max(0, min(target.nbytes, self._size - self._position))
+        if not count:
+            return 0
+
+        if self._view is not None:
+            target[:count] = self._view[self._position:self._position + count]
+        else:
+            self._file.seek(self._position)
+            data = self._file.read(count).data()
+            count = len(data)
+            target[:count] = data
+
+        self._position += count
+        return count
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._size - self._position
+        size = max(0, min(size, self._size - self._position))
+
+        if self._view is not None:
+            data = bytes(self._view[self._position:self._position + size])
+            self._position += size
+            return data
+        return super().read(size)
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+        super().close()
@@ -0,0 +1,302 @@
+import json
+import os
+import platform
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Sequence, TypeVar
+
+from src.utils import user_cache_dir
+
+INDEX_NAME = "steam_library_index.json"
+INDEX_VERSION = 1
+
+# How long a single path may take to answer before it is given up on, e.g.
+# a sleeping disk or an unreachable network mount.
+PROBE_TIMEOUT = 3.0
+
+# What `probe_paths` returns for a path that did not answer in time.
+TIMED_OUT = object()
+
+T = TypeVar("T")
+
+
+def probe_paths(
+        check: Callable[[T], Any],
+        items: Sequence[T],
+        timeout: float = PROBE_TIMEOUT,
+) -> list[Any]:
+    """
+    Runs `check` on every item at once and returns its results in order.
+    Items whose check raises OSError get None, and items that do not answer
+    within `timeout` seconds get TIMED_OUT. Each check runs in a daemon
+    thread, so one stuck on a dead mount cannot keep the installer from
+    exiting.
+    """
+    results: list[Any] = [TIMED_OUT] * len(items)
+
+    def run(index: int, item: T):
+        try:
+            results[index] = check(item)
+        except OSError:
+            results[index] = None
+
+    threads = [
+        threading.Thread(target=run, args=(index, item), daemon=True)
+        for index, item in enumerate(items)
+    ]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    return list(results)
+
+
+def find_steam_path() -> Optional[Path]:
+    system = platform.system()
+    possible_paths = []
+
+    match system:
+        case "Windows":
+            import winreg
+
+            try:
+                steam_key = winreg.OpenKey(
+                    winreg.HKEY_CURRENT_USER,
+                    r"Software\Valve\Steam"
+                )
+                steam_path = winreg.QueryValueEx(
+                    steam_key,
+                    "SteamPath"
+                )
+                winreg.CloseKey(steam_key)
+            except OSError:
+                steam_path = None
+
+            if steam_path:
+                possible_paths.append(Path(steam_path[0]))
+            possible_paths.extend([
+                Path(os.environ.get("ProgramFiles(x86)", "")) / "Steam",
+                Path(os.environ.get("ProgramFiles", "")) / "Steam",
+            ])
+
+        case "Linux":
+            possible_paths = [
+                Path().home()
+                / ".steam"
+                / "steam",
+                Path().home()
+                / ".local"
+                / "share"
+                / "Steam",
+                Path().home()
+                / "snap"
+                / "steam"
+                / "common"
+                / ".local"
+                / "share"
+                / "Steam",
+                Path().home()
+                / ".var"
+                / "app"
+                / "com.valvesoftware.Steam"
+                / "data"
+                / "Steam",
+            ]
+        case _:
+            return None
+
+    found = probe_paths(lambda path: path.resolve().exists(), possible_paths)
+    for path, exists in zip(possible_paths, found):
+        if exists is True:
+            return path
+
+    return None
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class SteamLibraryIndex:
+    """
+    Finds where Steam installed a set of apps. libraryfolders.vdf is parsed
+    once and the "apps" map of each library points straight at the one
+    holding an app, so only that app's manifest is read.
+
+    Results, misses included, are kept in the user cache directory and
+    reused while libraryfolders.vdf and the manifests keep their mtimes;
+    Steam rewrites libraryfolders.vdf whenever an app is installed,
+    moved or removed.
+    """
+
+    def __init__(self, steam_path: Path, index_path: Optional[Path] = None):
+        self.steam_path = steam_path
+        self.index_path = (index_path if index_path is not None
+                           else user_cache_dir() / INDEX_NAME)
+
+    @property
+    def library_folders_path(self) -> Path:
+        return self.steam_path / "steamapps" / "libraryfolders.vdf"
+
+    def find(self, app_ids: Iterable[int]) -> dict[int, Path]:
+        """
+        Maps each installed app in `app_ids` to its install directory.
+        """
+        app_ids = list(app_ids)
+        (folders_mtime,) = probe_paths(_mtime, [self.library_folders_path])
+        if folders_mtime is None or folders_mtime is TIMED_OUT:
+            return {}
+
+        apps = self._load(folders_mtime, app_ids)
+        if apps is None:
+            apps, complete = self._scan(app_ids)
+            # A library that timed out may still hold the game, so the
+            # miss is not worth remembering.
+            if complete:
+                self._save(folders_mtime, apps)
+
+        return {
+            app_id: Path(app["install_dir"])
+            for app_id, app in apps.items()
+            if app is not None
+        }
+
+    def _libraries(self, library_data: dict) -> list[tuple[Path, Optional[set]]]:
+        """
+        Every library with the ids of the apps it holds, or None when
+        libraryfolders.vdf predates the "apps" map.
+        """
+        libraries = []
+        folders = library_data.get("libraryfolders", {})
+        for key, entry in folders.items():
+            if isinstance(entry, dict) and "path" in entry:
+                apps = entry.get("apps")
+                libraries.append((
+                    Path(entry["path"]),
+                    set(apps) if isinstance(apps, dict) else None,
+                ))
+            elif isinstance(entry, str) and key.isdigit():
+                # Older format: the value is the library path itself.
+                libraries.append((Path(entry), None))
+
+        if not libraries:
+            libraries.append((self.steam_path, None))
+        return libraries
+
+    def _scan(
+            self,
+            app_ids: list[int],
+    ) -> tuple[dict[int, Optional[dict]], bool]:
+        """
+        Looks `app_ids` up in every library, and tells whether all of the
+        libraries answered.
+        """
+        import vdf
+
+        apps: dict[int, Optional[dict]] = dict.fromkeys(app_ids)
+        try:
+            with open(self.library_folders_path, encoding="utf-8") as file:
+                library_data = vdf.load(file)
+        except (OSError, SyntaxError):
+            return apps, False
+
+        # Every library that may hold an app is asked at once, so a slow
+        # or unreachable one only delays the search by the probe timeout.
+        candidates = [
+            (library_path, app_id)
+            for library_path, library_apps in self._libraries(library_data)
+            for app_id in app_ids
+            if library_apps is None or str(app_id) in library_apps
+        ]
+        found = probe_paths(
+            lambda candidate: self._read_manifest(vdf, *candidate),
+            candidates,
+        )
+        for (_, app_id), app in zip(candidates, found):
+            if apps[app_id] is None and app is not TIMED_OUT:
+                apps[app_id] = app
+
+        return apps, TIMED_OUT not in found
+
+    @staticmethod
+    def _read_manifest(vdf, library_path: Path, app_id: int) -> Optional[dict]:
+        manifest_path = (library_path
+                         / "steamapps"
+                         / f"appmanifest_{app_id}.acf")
+        try:
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest_mtime = os.fstat(file.fileno()).st_mtime_ns
+                manifest = vdf.load(file)
+            install_dir = manifest["AppState"]["installdir"]
+        except (OSError, SyntaxError, KeyError, TypeError):
+            return None
+
+        game_path = library_path / "steamapps" / "common" / install_dir
+        if not game_path.exists():
+            return None
+
+        return {
+            "manifest": str(manifest_path),
+            "manifest_mtime": manifest_mtime,
+            "install_dir": str(game_path.resolve()),
+        }
+
+    def _load(
+            self,
+            folders_mtime: int,
+            app_ids: list[int],
+    ) -> Optional[dict[int, Optional[dict]]]:
+        """
+        The cached lookup of `app_ids`, or None when it is missing or stale.
+        """
+        try:
+            with open(self.index_path, encoding="utf-8") as file:
+                index = json.load(file)
+            if (index["version"] != INDEX_VERSION
+                    or index["steam_path"] != str(self.steam_path)
+                    or index["library_folders_mtime"] != folders_mtime):
+                return None
+            cached = index["apps"]
+            apps = {app_id: cached[str(app_id)] for app_id in app_ids}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        # A cached library may sit on a mount that stopped answering, so
+        # its checks get the same timeout as a scan.
+        found = [app for app in apps.values() if app is not None]
+        fresh = probe_paths(self._is_fresh, found)
+        if not all(result is True for result in fresh):
+            return None
+        return apps
+
+    @staticmethod
+    def _is_fresh(app: dict) -> bool:
+        try:
+            manifest = Path(app["manifest"])
+            install_dir = Path(app["install_dir"])
+            manifest_mtime = app["manifest_mtime"]
+        except (KeyError, TypeError):
+            return False
+        return _mtime(manifest) == manifest_mtime and install_dir.is_dir()
+
+    def _save(self, folders_mtime: int, apps: dict[int, Optional[dict]]) -> None:
+        index = {
+            "version": INDEX_VERSION,
+            "steam_path": str(self.steam_path),
+            "library_folders_mtime": folders_mtime,
+            "apps": {str(app_id): app for app_id, app in apps.items()},
+        }
+        temp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_text(json.dumps(index, indent=2), encoding="utf-8")
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            # Without a cache the next search just scans again.
+            pass
@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -13,3 +14,41 @@ def resource_path(relative_path: str) -> Path:
             1]
 
     return base_path / relative_path
+
+
+def format_file_size(size_bytes: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size_bytes < 1024:
+            return f"{size_bytes:.2f} {unit}"
+        size_bytes /= 1024
+    return f"{size_bytes:.2f} TB"
+
+
+def user_cache_dir() -> Path:
+    """
+    Returns the per-user cache directory of the installer, following each
+    platform's convention. The directory is not created.
+    """
+    if sys.platform == "win32":
+        base_path = Path(
+            os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        )
+    elif sys.platform == "darwin":
+        base_path = Path.home() / "Library" / "Caches"
+    else:
+        base_path = Path(
+            os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        )
+
+    return base_path / "ut-translation-setup"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = max(0, round(seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} min {seconds:02d} s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min"
@@ -1,14 +1,27 @@
 from math import floor
 from pathlib import Path
+from typing import Optional
 
-from PySide6.QtCore import QSize
+from PySide6.QtCore import QSize, QObject, QEvent, Qt
 from PySide6.QtGui import QIcon
-from PySide6.QtWidgets import QMainWindow, QStackedWidget
+from PySide6.QtWidgets import QMainWindow, QStackedWidget, QPushButton, \
+    QWidget
+
+
+class ButtonDisableFilter(QObject):
+    """
+    This filter prevents the hover effect
+    freeze after a QPushButton is set to disable.
+    """
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.EnabledChange:
+            if isinstance(obj, QPushButton) and not obj.isEnabled():
+                obj.setAttribute(Qt.WidgetAttribute.WA_UnderMouse, False)
+                obj.style().unpolish(obj)
+                obj.style().polish(obj)
+        return super().eventFilter(obj, event)
 
-from src.pages.final_page import FinalPage
-from src.pages.install_files import InstallFilesPage
-from src.pages.pick_target import PickTargetPage
-from src.pages.welcome import WelcomePage
 
 class AppWindow(QMainWindow):
     def __init__(self, config):
@@ -25,47 +38,87 @@ class AppWindow(QMainWindow):
             (4, 3)
         ))
 
+        # Pages are only built, and their modules imported, the first
+        # time they are shown; the welcome page is all the first paint needs.
         self.page_stack = QStackedWidget()
-        self.welcome_page = WelcomePage()
-        self.pick_target_page = PickTargetPage()
-        self.install_files_page = InstallFilesPage()
-        self.final_page = FinalPage()
-
-        self._connect_signals()
-
-        self.page_stack.addWidget(self.welcome_page)
-        self.page_stack.addWidget(self.pick_target_page)
-        self.page_stack.addWidget(self.install_files_page)
-        self.page_stack.addWidget(self.final_page)
-        self.pick_target_page.clicked_back.connect(self._go_back_to_welcome)
+        self._page_factories = [
+            self._create_welcome_page,
+            self._create_pick_target_page,
+            self._create_install_files_page,
+            self._create_final_page,
+        ]
+        self._pages: list[Optional[QWidget]] = [None] * len(self._page_factories)
+        self._current_page = 0
+        self.page_stack.setCurrentWidget(self._page(0))
 
         self.setCentralWidget(self.page_stack)
 
-    def _connect_signals(self):
-        self.welcome_page.finished.connect(self._next_page)
-
-        self.pick_target_page.finished.connect(self._on_pick_target_finished)
-        self.install_files_page.finished.connect(self._next_page)
-        self.final_page.quit.connect(self._on_quit)
-
-    def _on_pick_target_finished(self, target_path: Path, is_demo: bool, make_backup: bool):
-        self.install_files_page.set_target_path(target_path)
-        self.install_files_page.set_is_demo(is_demo)
-        self.install_files_page.set_make_backup(make_backup)
+    def _page(self, index: int) -> QWidget:
+        page = self._pages[index]
+        if page is None:
+            page = self._page_factories[index]()
+            self._pages[index] = page
+            self.page_stack.addWidget(page)
+        return page
+
+    def _show_page(self, index: int):
+        self._current_page = index
+        self.page_stack.setCurrentWidget(self._page(index))
+
+    def _create_welcome_page(self) -> QWidget:
+        from src.pages.welcome import WelcomePage
+
+        page = WelcomePage()
+        page.finished.connect(self._next_page)
+        return page
+
+    def _create_pick_target_page(self) -> QWidget:
+        from src.pages.pick_target import PickTargetPage
+
+        page = PickTargetPage()
+        page.finished.connect(self._on_pick_target_finished)
+        page.clicked_back.connect(self._go_back_to_welcome)
+        return page
+
+    def _create_install_files_page(self) -> QWidget:
+        from src.pages.install_files import InstallFilesPage
+
+        page = InstallFilesPage(
+            setup_version=self.config.get("setup_version", "")
+        )
+        page.finished.connect(self._next_page)
+        return page
+
+    def _create_final_page(self) -> QWidget:
+        from src.pages.final_page import FinalPage
+
+        page = FinalPage()
+        page.quit.connect(self._on_quit)
+        return page
+
+    def _on_pick_target_finished(
+            self,
+            target_path: Path,
+            is_demo: bool,
+            make_backup: bool,
+            throughput: Optional[float],
+    ):
+        install_files_page = self._page(2)
+        install_files_page.set_target_path(target_path)
+        install_files_page.set_is_demo(is_demo)
+        install_files_page.set_make_backup(make_backup)
+        install_files_page.set_throughput(throughput)
         self._next_page()
 
     def _on_quit(self):
         self.close()
 
     def _next_page(self):
-        index = self.page_stack.currentIndex()
-        count = self.page_stack.count()
-        if index < count - 1:
-            self.page_stack.setCurrentIndex(index + 1)
-            
+        if self._current_page < len(self._page_factories) - 1:
+            self._show_page(self._current_page + 1)
 
     def _go_back_to_welcome(self):
-        self.page_stack.setCurrentWidget(self.welcome_page)
+        self._show_page(0)
 
     @staticmethod
     def _resize_with_ratio(
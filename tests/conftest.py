@@ -0,0 +1,22 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fixtures import make_pck, make_translation_zip
+from tests.support import ENTRIES, ENTRY_SIZE, TRANSLATED
+
+
+@pytest.fixture
+def target(tmp_path: Path) -> Path:
+    game = tmp_path / "game"
+    game.mkdir()
+    path = game / "UntilThen.pck"
+    make_pck(path, ENTRIES, ENTRIES * ENTRY_SIZE)
+    return path
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Path:
+    path = tmp_path / "translation_files.zip"
+    make_translation_zip(path, ENTRIES, TRANSLATED, ENTRY_SIZE)
+    return path
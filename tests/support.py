@@ -0,0 +1,23 @@
+import zipfile
+from functools import partial
+from pathlib import Path
+
+from src.engine import Installer
+from src.resource_io import ResourceReader
+
+ENTRIES = 10
+ENTRY_SIZE = 4096
+TRANSLATED = 4
+
+
+def add_new_file(archive: Path, name: str = "assets/new/extra_file.bin"):
+    """
+    Adds a path the PCK does not have, which leaves no room to append in
+    place, so installing the archive rebuilds the PCK.
+    """
+    with zipfile.ZipFile(archive, "a") as zf:
+        zf.writestr(f"full/{name}", b"new" * 100)
+
+
+def make_installer(target: Path, archive: Path, **kwargs) -> Installer:
+    return Installer(target, partial(ResourceReader, str(archive)), **kwargs)
@@ -0,0 +1,96 @@
+import zipfile
+
+import pytest
+
+import src.engine.patch
+from benchmarks.fixtures import entry_paths, make_pck
+from src.backup import BackupError, DELTA_NAME, restore_original
+from tests.support import add_new_file, make_installer
+
+ENTRIES = 20
+ENTRY_SIZE = 4096
+
+
+def _translation(path, indices, fill: bytes):
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in indices:
+            zf.writestr(f"full/{entry_paths(ENTRIES)[i]}", fill * ENTRY_SIZE)
+    return path
+
+
+def _no_reflinks(source, backup, in_place, allow_copy=True):
+    raise BackupError("sem reflink")
+
+
+@pytest.mark.parametrize("rebuild", [False, True])
+def test_delta_restores_original_after_two_installs(
+        tmp_path, monkeypatch, rebuild
+):
+    # Only a reflink would be preferred over a delta.
+    monkeypatch.setattr(src.engine.patch, "create_backup", _no_reflinks)
+    target = tmp_path / "UntilThen.pck"
+    make_pck(target, ENTRIES, ENTRIES * ENTRY_SIZE)
+    original = target.read_bytes()
+
+    first = _translation(tmp_path / "v1.zip", range(10), b"1")
+    second = _translation(tmp_path / "v2.zip", range(15), b"2")
+    if rebuild:
+        add_new_file(second)
+
+    for archive in (first, second):
+        installer = make_installer(target, archive, make_backup=True)
+        installer.prepare()
+        installer.install()
+        assert installer.backup_strategy in (None, "delta")
+    assert (tmp_path / DELTA_NAME).exists()
+
+    restore_original(target)
+
+    assert target.read_bytes() == original
+
+
+def test_install_is_refused_when_delta_cannot_be_extended(
+        tmp_path, monkeypatch
+):
+    monkeypatch.setattr(src.engine.patch, "create_backup", _no_reflinks)
+    target = tmp_path / "UntilThen.pck"
+    make_pck(target, ENTRIES, ENTRIES * ENTRY_SIZE)
+
+    installer = make_installer(
+        target, _translation(tmp_path / "v1.zip", range(10), b"1"),
+        make_backup=True,
+    )
+    installer.prepare()
+    installer.install()
+    (tmp_path / DELTA_NAME).write_bytes(b"corrompido")
+    installed = target.read_bytes()
+
+    installer = make_installer(
+        target, _translation(tmp_path / "v2.zip", range(15), b"2"),
+        make_backup=True,
+    )
+    installer.prepare()
+    with pytest.raises(BackupError):
+        installer.install()
+    installer.rollback()
+
+    assert target.read_bytes() == installed
+
+
+def test_backup_is_taken_for_the_rebuild_when_append_cannot_fit(
+        target, archive, monkeypatch
+):
+    add_new_file(archive)
+    real_make_backup = src.engine.patch.make_backup
+    appends = []
+
+    def make_backup(source, backup_dir, append, patches, on_backup=None):
+        appends.append(append)
+        real_make_backup(source, backup_dir, append, patches, on_backup)
+
+    monkeypatch.setattr(src.engine.patch, "make_backup", make_backup)
+    installer = make_installer(target, archive)
+    installer.prepare()
+    installer.install()
+
+    assert appends == [False]
@@ -0,0 +1,190 @@
+import io
+import os
+
+import pytest
+
+import src.engine.patch
+from src import pck
+from src.backup import BACKUP_NAME, has_backup
+from src.engine import Installer, InstallRecovered, recover_install
+from src.engine.journal import JOURNAL_NAME, UNDO_NAME
+from src.pck import PatchEntry, build_patched_pck, check_pck, \
+    read_install_marker
+from tests.support import add_new_file, make_installer
+
+
+class _Crash(Exception):
+    pass
+
+
+def _fail_in_file_table(file, index):
+    file.write(b"\0" * 16)
+    raise OSError("disco removido")
+
+
+def _append_then_break_header(monkeypatch):
+    """
+    Makes the in-place append save its undo record, clobber the PCK
+    header and fail, as a crash in the middle of the write would.
+    """
+    real_append = src.engine.patch.append_patches
+
+    def append(path, patches, progress=None, on_undo=None):
+        real_append(path, patches, progress, on_undo)
+        with open(path, "r+b") as file:
+            file.write(b"\0" * 16)
+        raise OSError("disco removido")
+
+    monkeypatch.setattr(src.engine.patch, "append_patches", append)
+
+
+def _packer_output(target, archive):
+    """
+    An installer about to commit output as the external packer leaves
+    it, with the original to be renamed into the backup.
+    """
+    installer = make_installer(target, archive)
+    installer.prepare()
+    patch = PatchEntry("assets/dir0/file0.bin", 5, lambda: io.BytesIO(b"hello"))
+    build_patched_pck(target, installer.output, [patch])
+    installer.journal.begin("packer", installer.marker, True)
+    return installer
+
+
+def _crash_on_replace(monkeypatch, call):
+    real_replace = os.replace
+    calls = 0
+
+    def replace(src, dst):
+        nonlocal calls
+        calls += 1
+        if calls == call:
+            raise _Crash()
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+
+
+def _no_journal(target):
+    return (not (target.parent / JOURNAL_NAME).exists()
+            and not (target.parent / UNDO_NAME).exists())
+
+
+def test_append_restores_header_when_file_table_write_fails(
+        target, monkeypatch
+):
+    original = target.read_bytes()
+    monkeypatch.setattr(pck, "write_index", _fail_in_file_table)
+
+    patch = PatchEntry("assets/dir0/file0.bin", 5, lambda: io.BytesIO(b"hello"))
+    with pytest.raises(OSError):
+        pck.append_patches(target, [patch])
+
+    assert target.read_bytes() == original
+
+
+def test_rollback_applies_saved_undo_after_failed_append(
+        target, archive, monkeypatch
+):
+    original = target.read_bytes()
+    _append_then_break_header(monkeypatch)
+
+    installer = make_installer(target, archive, make_backup=False)
+    installer.prepare()
+    with pytest.raises(OSError):
+        installer.install()
+    installer.rollback()
+
+    assert target.read_bytes() == original
+    assert _no_journal(target)
+
+
+def test_interrupted_append_is_undone_on_next_run(
+        target, archive, monkeypatch
+):
+    original = target.read_bytes()
+    _append_then_break_header(monkeypatch)
+
+    installer = make_installer(target, archive, make_backup=False)
+    installer.prepare()
+    with pytest.raises(OSError):
+        installer.install()
+    monkeypatch.undo()
+
+    events = []
+    make_installer(
+        target, archive, make_backup=False, on_event=events.append
+    ).prepare()
+
+    assert InstallRecovered("back") in events
+    assert target.read_bytes() == original
+    assert _no_journal(target)
+
+
+def test_interrupted_swap_is_finished_on_next_run(
+        target, archive, monkeypatch
+):
+    add_new_file(archive)
+
+    def crash(self, rename_backup):
+        raise _Crash()
+
+    monkeypatch.setattr(Installer, "_swap", crash)
+    installer = make_installer(target, archive, make_backup=False)
+    installer.prepare()
+    with pytest.raises(_Crash):
+        installer.install()
+    monkeypatch.undo()
+    assert installer.output.exists()
+
+    events = []
+    make_installer(
+        target, archive, make_backup=False, on_event=events.append
+    ).prepare()
+
+    assert InstallRecovered("forward") in events
+    check_pck(target)
+    with open(target, "rb") as file:
+        assert read_install_marker(file) == installer.marker
+    assert not installer.output.exists()
+    assert _no_journal(target)
+
+
+def test_crash_between_renames_is_recovered_without_the_pck(
+        target, archive, monkeypatch
+):
+    installer = _packer_output(target, archive)
+    _crash_on_replace(monkeypatch, call=2)
+    with pytest.raises(_Crash):
+        installer.commit(mark=True)
+    monkeypatch.undo()
+    assert not target.exists()
+    assert (target.parent / BACKUP_NAME).exists()
+
+    assert recover_install(target) == "forward"
+
+    check_pck(target)
+    with open(target, "rb") as file:
+        assert read_install_marker(file) == installer.marker
+    assert has_backup(target)
+    assert _no_journal(target)
+
+
+def test_crash_after_swap_still_records_renamed_backup(
+        target, archive
+):
+    installer = _packer_output(target, archive)
+
+    def crash():
+        raise _Crash()
+
+    installer.journal.finish = crash
+    with pytest.raises(_Crash):
+        installer.commit(mark=True)
+    assert not installer.output.exists()
+    assert not has_backup(target)
+
+    assert recover_install(target) == "forward"
+
+    assert has_backup(target)
+    assert _no_journal(target)
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from src.engine import PackerError, PackerLog, PackerOutput, \
+    PackerProgress, packer
+from src.engine.journal import JOURNAL_NAME
+from src.pck import check_pck, read_install_marker
+from tests.support import make_installer
+
+pytestmark = pytest.mark.skipif(
+    os.name == "nt", reason="the fake packer is a shell script"
+)
+
+
+def _fake_packer(tmp_path, script: str):
+    folder = tmp_path / "packer"
+    folder.mkdir()
+    program = packer.packer_program(folder)
+    program.write_text("#!/bin/sh\n" + script)
+    return folder
+
+
+def _run(target, archive, tmp_path, script, monkeypatch):
+    monkeypatch.setattr(packer, "POLL_SECONDS", 0.01)
+    events = []
+    installer = make_installer(
+        target, archive, make_backup=False, on_event=events.append
+    )
+    installer.packer_log = PackerLog(tmp_path / "packer.log")
+    installer.prepare()
+    files_dir = tmp_path / "files"
+    files_dir.mkdir()
+    installer.run_packer(_fake_packer(tmp_path, script), files_dir)
+    return installer, events
+
+
+def test_packer_output_is_committed(target, archive, tmp_path, monkeypatch):
+    # Arguments: -pc, the PCK, the files, the output, the version.
+    installer, events = _run(target, archive, tmp_path, (
+        'printf "[ 50%%]\\r"\n'
+        "sleep 0.2\n"
+        'echo "Error: ignored entry"\n'
+        'cp "$2" "$4"\n'
+        'printf "Done"\n'
+    ), monkeypatch)
+
+    check_pck(target)
+    with open(target, "rb") as file:
+        assert read_install_marker(file) == installer.marker
+    assert PackerOutput("Error: ignored entry") in events
+    assert any(
+        isinstance(event, PackerProgress) and event.fraction >= 0.5
+        for event in events
+    )
+    assert list(installer.packer_log.tail)[-1] == "Done"
+    assert not (target.parent / JOURNAL_NAME).exists()
+
+
+def test_packer_without_output_is_rolled_back(
+        target, archive, tmp_path, monkeypatch
+):
+    original = target.read_bytes()
+
+    with pytest.raises(PackerError, match="Código: 3"):
+        _run(target, archive, tmp_path, (
+            'echo "Fail: boom"\n'
+            "exit 3\n"
+        ), monkeypatch)
+
+    assert target.read_bytes() == original
+    assert not (target.parent / JOURNAL_NAME).exists()
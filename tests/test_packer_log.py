@@ -0,0 +1,34 @@
+from src.engine import PackerLog
+
+
+def test_log_keeps_tail_and_rotates_full_output(tmp_path):
+    path = tmp_path / "packer.log"
+    log = PackerLog(path, max_bytes=4096, backups=50)
+    log.open()
+    lines = [f"linha {i}" for i in range(2000)]
+    for line in lines:
+        log.write(line)
+    log.close()
+
+    assert list(log.tail) == lines[-5:]
+    assert all(p.stat().st_size <= 4096 for p in tmp_path.iterdir())
+    written = []
+    for backup in range(50, 0, -1):
+        rotated = tmp_path / f"packer.log.{backup}"
+        if rotated.exists():
+            written += rotated.read_text(encoding="utf-8").splitlines()
+    written += path.read_text(encoding="utf-8").splitlines()
+    assert written == lines
+
+
+def test_next_run_rolls_previous_log_over(tmp_path):
+    path = tmp_path / "packer.log"
+    log = PackerLog(path)
+    for run in ("primeira", "segunda"):
+        log.open()
+        log.write(run)
+        log.close()
+
+    assert path.read_text(encoding="utf-8") == "segunda\n"
+    rotated = tmp_path / "packer.log.1"
+    assert rotated.read_text(encoding="utf-8") == "primeira\n"
@@ -0,0 +1,68 @@
+import hashlib
+import io
+
+import pytest
+
+from src.pck import PCKFormatError, PatchEntry, append_patches, \
+    build_patched_pck, check_pck, normalize_path, read_index, undo_append
+
+NEW_PATH = "assets/new/extra_file.bin"
+
+
+def _patches(contents: dict[str, bytes]) -> list[PatchEntry]:
+    return [
+        PatchEntry(path, len(data), lambda data=data: io.BytesIO(data))
+        for path, data in contents.items()
+    ]
+
+
+def _read_entries(path) -> dict[str, bytes]:
+    """
+    Every entry of the PCK at `path`, read back through its file table,
+    after checking its data against the MD5 stored there.
+    """
+    contents = {}
+    with open(path, "rb") as file:
+        index = read_index(file)
+        for entry in index.entries:
+            file.seek(index.file_base + entry.offset)
+            data = file.read(entry.size)
+            assert hashlib.md5(data).digest() == entry.md5, entry.path
+            contents[normalize_path(entry.path)] = data
+    return contents
+
+
+def test_patched_pck_reads_back_with_matching_md5(target, tmp_path):
+    original = _read_entries(target)
+    replaced = next(iter(original))
+    patched = {replaced: b"traduzido" * 500, NEW_PATH: b"novo" * 300}
+
+    output = tmp_path / "patched.pck"
+    build_patched_pck(target, output, _patches(patched))
+
+    check_pck(output)
+    assert _read_entries(output) == {**original, **patched}
+
+
+def test_append_reads_back_and_undoes_to_original_bytes(target):
+    original_bytes = target.read_bytes()
+    original = _read_entries(target)
+    patched = {path: path.encode() * 200 for path in list(original)[:3]}
+
+    undo = append_patches(target, _patches(patched))
+
+    check_pck(target)
+    assert _read_entries(target) == {**original, **patched}
+
+    undo_append(target, undo)
+    assert target.read_bytes() == original_bytes
+
+
+def test_append_refuses_paths_without_room_in_file_table(target):
+    original_bytes = target.read_bytes()
+    many = {f"assets/new/file{i}.bin": b"x" for i in range(200)}
+
+    with pytest.raises(PCKFormatError):
+        append_patches(target, _patches(many))
+
+    assert target.read_bytes() == original_bytes
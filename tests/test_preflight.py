@@ -0,0 +1,41 @@
+import pytest
+
+import src.engine.installer
+from tests.support import make_installer
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    sizes = []
+
+    def measure(folder, size):
+        sizes.append(size)
+        return 1024 * 1024.0
+
+    monkeypatch.setattr(src.engine.installer, "measure_throughput", measure)
+    return sizes
+
+
+def test_small_install_is_not_timed(target, archive, tmp_path, probes):
+    installer = make_installer(target, archive)
+    installer.prepare()
+
+    preflight = installer.preflight(tmp_path)
+
+    assert preflight.write_bytes
+    assert not probes
+    assert preflight.eta is None
+
+
+def test_probe_writes_no_more_than_the_install(
+        target, archive, tmp_path, probes, monkeypatch
+):
+    monkeypatch.setattr(src.engine.installer, "MIN_PROBE_BYTES", 0)
+    installer = make_installer(target, archive)
+    installer.prepare()
+
+    preflight = installer.preflight(tmp_path)
+    installer.preflight(tmp_path)
+
+    assert probes == [preflight.write_bytes]
+    assert preflight.eta is not None
@@ -0,0 +1,84 @@
+import os
+import time
+import zipfile
+from functools import partial
+
+from src.engine import toolchain
+from src.engine.toolchain import ToolchainCache, bundle_hash
+from src.progress import ProgressAggregator
+from src.resource_io import ResourceReader
+
+PACKER = "GodotPCKExplorer.Console"
+
+
+def _bundle(tmp_path):
+    path = tmp_path / "packer.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(PACKER, b"\x7fELF" + b"original" * 100)
+        zf.writestr("lib/helper.so", b"helper" * 100)
+    return partial(ResourceReader, str(path))
+
+
+def _fetch(cache, open_bundle):
+    return cache.fetch(open_bundle, ProgressAggregator(lambda snapshot: None))
+
+
+def test_swapped_packer_of_same_size_is_not_used(tmp_path):
+    open_bundle = _bundle(tmp_path)
+    cache = ToolchainCache("1.0", tmp_path / "cache")
+    folder = _fetch(cache, open_bundle)
+    digest = bundle_hash(open_bundle)
+    assert cache.lookup(digest) == folder
+
+    packer = folder / PACKER
+    packer.write_bytes(b"\x7fELF" + b"tampered" * 100)
+    assert cache.lookup(digest) is None
+
+    assert _fetch(cache, open_bundle) == folder
+    assert packer.read_bytes() == b"\x7fELF" + b"original" * 100
+
+
+def test_warm_cache_hit_hashes_nothing(tmp_path, monkeypatch):
+    open_bundle = _bundle(tmp_path)
+    cache = ToolchainCache("1.0", tmp_path / "cache")
+    folder = _fetch(cache, open_bundle)
+
+    hashed = []
+    monkeypatch.setattr(
+        toolchain, "_sha256", lambda stream: hashed.append(stream)
+    )
+
+    assert _fetch(cache, open_bundle) == folder
+    assert not hashed
+
+
+def test_bundle_with_backslash_paths_is_cached(tmp_path):
+    path = tmp_path / "packer.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(PACKER, b"\x7fELF" + b"original" * 100)
+        # As written by Windows tools, folder entry included.
+        zf.writestr("lib\\", b"")
+        zf.writestr("lib\\helper.so", b"helper" * 100)
+    open_bundle = partial(ResourceReader, str(path))
+    cache = ToolchainCache("1.0", tmp_path / "cache")
+
+    folder = _fetch(cache, open_bundle)
+
+    assert (folder / "lib" / "helper.so").read_bytes() == b"helper" * 100
+    assert cache.lookup(bundle_hash(open_bundle)) == folder
+
+
+def test_evict_keeps_staging_folders_still_being_written(tmp_path):
+    cache = ToolchainCache("1.0", tmp_path / "cache")
+    cache.root.mkdir()
+    live = cache.root / "1.0-abc.99999.partial"
+    stale = cache.root / "1.0-def.99998.partial"
+    live.mkdir()
+    stale.mkdir()
+    old = time.time() - 2 * 60 * 60
+    os.utime(stale, (old, old))
+
+    cache.evict()
+
+    assert live.exists()
+    assert not stale.exists()
@@ -0,0 +1,55 @@
+"""
+Embeds manifest.json (path -> size and MD5 of every translated file) into
+the translation archive, so the installer can skip files that are already
+in place.
+
+    python -m tools.build_manifest assets/translation_files.zip --version 1.1.3
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+
+from src.manifest import MANIFEST_NAME, build_manifest
+
+
+def embed_manifest(archive: Path, version: str) -> dict:
+    with zipfile.ZipFile(archive) as zf:
+        manifest = build_manifest(zf, version)
+        has_manifest = MANIFEST_NAME in zf.namelist()
+
+    if has_manifest:
+        # zipfile cannot replace a member, so the archive is rebuilt
+        # without the stale manifest.
+        with tempfile.NamedTemporaryFile(
+                dir=archive.parent, suffix=".zip", delete=False
+        ) as temp:
+            temp_path = Path(temp.name)
+        with zipfile.ZipFile(archive) as src, \
+                zipfile.ZipFile(temp_path, "w") as dst:
+            for info in src.infolist():
+                if info.filename != MANIFEST_NAME:
+                    dst.writestr(info, src.read(info))
+        shutil.move(temp_path, archive)
+
+    with zipfile.ZipFile(archive, "a", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1))
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("archive", type=Path)
+    parser.add_argument("--version", required=True)
+    args = parser.parse_args()
+
+    manifest = embed_manifest(args.archive, args.version)
+    for folder, files in manifest["folders"].items():
+        print(f"{folder}: {len(files)} files")
+
+
+if __name__ == "__main__":
+    main()
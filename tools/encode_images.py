@@ -0,0 +1,44 @@
+"""
+Re-encodes UI images as lossy WebP next to the originals before they are
+compiled into assets.rcc, which keeps the bundle and the decode small.
+
+    python -m tools.encode_images assets/banner.png [--quality 90]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from PySide6.QtGui import QImage, QImageWriter
+
+
+def encode(image_path: Path, quality: int) -> Path:
+    output = image_path.with_suffix(".webp")
+    image = QImage(str(image_path))
+    if image.isNull():
+        raise OSError(f"Falha ao ler {image_path}")
+
+    writer = QImageWriter(str(output), b"webp")
+    writer.setQuality(quality)
+    if not writer.write(image):
+        raise OSError(f"Falha ao gravar {output}: {writer.errorString()}")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", type=Path, nargs="+")
+    parser.add_argument("--quality", type=int, default=90)
+    args = parser.parse_args()
+
+    for image_path in args.images:
+        try:
+            output = encode(image_path, args.quality)
+        except OSError as error:
+            print(error, file=sys.stderr)
+            sys.exit(1)
+        print(f"{image_path} ({image_path.stat().st_size} bytes)"
+              f" -> {output} ({output.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()